@@ -1,4 +1,7 @@
-from PyQt5 import QtCore, QtWidgets
+from math import floor, log2
+
+import numpy as np
+from PyQt5 import QtCore, QtGui, QtWidgets
 
 
 class CityItem(QtWidgets.QGraphicsEllipseItem):
@@ -11,3 +14,51 @@ class CityItem(QtWidgets.QGraphicsEllipseItem):
 
     def mousePressEvent(self, event):
         self.callback(self.idx)
+
+
+class CityCloudItem(QtWidgets.QGraphicsItem):
+    """All cities of a large instance as one item
+
+    When zoomed out, such that many cities fall onto one pixel, only one city
+    per cell of about a pixel is drawn. The thinned points are cached per
+    power-of-two cell size.
+    """
+    def __init__(self, cities, ps):
+        super().__init__()
+        self.cities = np.asarray(cities, dtype=np.float64).reshape(-1, 2)
+        self.ps = ps
+        self.pen = QtGui.QPen()
+        self.pen.setCapStyle(QtCore.Qt.RoundCap)
+        self.pen.setWidthF(ps)
+        self.cache = {}
+        if len(self.cities):
+            (x0, y0), (x1, y1) = self.cities.min(axis=0), self.cities.max(axis=0)
+        else:
+            x0 = y0 = x1 = y1 = 0.
+        self.rect = QtCore.QRectF(x0 - ps, y0 - ps, x1 - x0 + 2 * ps, y1 - y0 + 2 * ps)
+
+    def setPen(self, pen):
+        self.pen.setColor(pen.color())
+        self.update()
+
+    def boundingRect(self):
+        return self.rect
+
+    def points(self, level):
+        """Polygon of the cities, at most one per cell of size 2^level"""
+        if level not in self.cache:
+            cell = 2. ** level
+            if cell < self.ps:
+                p = self.cities
+            else:
+                cells = np.floor(self.cities / cell).astype(np.int64)
+                _, idx = np.unique(cells, axis=0, return_index=True)
+                p = self.cities[np.sort(idx)]
+            self.cache[level] = QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in p.tolist()])
+        return self.cache[level]
+
+    def paint(self, painter, option, widget=None):
+        # pixels per scene unit
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        painter.setPen(self.pen)
+        painter.drawPoints(self.points(floor(log2(1. / lod))))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Solve an instance without the GUI and print the result as JSON
+
+    python3 cli.py --ensemble dce -N 1000 --sigma 5 --method Greedy --2opt
+    python3 cli.py --tsplib TSPLIB/berlin52.tsp.gz --method "Farthest Insertion" --concorde
+    python3 cli.py -N 100000 --method Greedy --2opt --lk --time-limit 10
+    python3 cli.py -N 20000 --method Greedy --2opt --lower-bound 60
+"""
+
+import argparse
+from math import inf, pi
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+import concorde
+from configuration import Configuration
+
+METHODS = [
+    "Nearest Neighbor",
+    "Greedy",
+    "Farthest Insertion",
+    "Nearest Insertion",
+    "Cheapest Insertion",
+    "Random Insertion",
+    "Random",
+]
+
+
+def parseArgs(args=None):
+    parser = argparse.ArgumentParser(description="Run a TSP heuristic without the GUI.")
+    parser.add_argument("--tsplib", metavar="FILE", help="TSPLIB instance (.tsp or .tsp.gz)")
+    parser.add_argument("--ensemble", choices=["square", "dce"], default="square",
+                        help="random ensemble, if no TSPLIB file is given")
+    parser.add_argument("-N", type=int, default=100, help="number of cities of the random ensemble")
+    parser.add_argument("--sigma", type=float, default=0.,
+                        help="displacement of the DCE ensemble, as the spin box in the GUI")
+    parser.add_argument("--seed", type=int, help="seed of the random ensemble and the random methods")
+    parser.add_argument("--method", choices=METHODS, default="Nearest Neighbor")
+    parser.add_argument("--2opt", dest="twoOpt", action="store_true", help="improve with 2-opt")
+    parser.add_argument("--2opt-method", dest="twoOptMethod", default="Neighbor Lists",
+                        choices=["Neighbor Lists", "Vectorized", "First Improvement"])
+    parser.add_argument("--oropt", action="store_true", help="improve with Or-opt")
+    parser.add_argument("--lk", action="store_true", help="improve with Lin-Kernighan")
+    parser.add_argument("--concorde", action="store_true",
+                        help="compute the optimum with ./concorde to report the gap")
+    parser.add_argument("--time-limit", dest="timeLimit", type=float, metavar="SECONDS",
+                        help="stop the search after this time")
+    parser.add_argument("--target-gap", dest="targetGap", type=float, metavar="GAP",
+                        help="stop as soon as the gap to the optimum is below this, needs --concorde")
+    parser.add_argument("--lower-bound", dest="lowerBound", type=float, nargs="?", const=inf, metavar="SECONDS",
+                        help="compute the Held-Karp lower bound (for at most SECONDS) to report the gap to it")
+    parser.add_argument("--tour", action="store_true", help="include the tour in the output")
+    return parser.parse_args(args)
+
+
+def solve(args, shared=None):
+    """Run the instance described by `args`, `shared` is its SharedInstance if it is published"""
+    conf = Configuration()
+    conf.currentMethod = args.method
+    conf.twoOptMethod = args.twoOptMethod
+    postOpt = [name for name, b in (("2-opt", args.twoOpt), ("Or-opt", args.oropt), ("Lin-Kernighan", args.lk)) if b]
+
+    if args.seed is not None:
+        # the ensembles use numpy, the random construction methods the random module
+        np.random.seed(args.seed)
+        random.seed(args.seed)
+
+    if args.tsplib:
+        if shared is not None:
+            conf.sharedInit(shared)
+        else:
+            conf.TSPLIBInit(args.tsplib)
+        instance = os.path.basename(args.tsplib)
+    else:
+        conf.setN(args.N)
+        if args.ensemble == "dce":
+            # same scaling as Configuration.setSigma
+            conf.sigma = args.sigma / 2 / conf.N * pi
+            conf.DCEInit()
+        else:
+            conf.randInit()
+        instance = args.ensemble
+
+    if args.concorde and concorde.available():
+        conf.setDoConcorde(True)
+
+    elapsed, length, moves = conf.solve(postOpt=postOpt, timeLimit=args.timeLimit,
+                                        targetGap=args.targetGap if conf.hasOptimum() else None)
+    # the last step of the construction only notices that it is finished
+    steps = moves - conf.n2Opt() - conf.nOrOpt() - conf.nLinKernighan() - conf.finishedFirst
+
+    result = {
+        "instance": instance,
+        "N": len(conf.getCities()),
+        "method": args.method,
+        "length": length,
+        "time": elapsed,
+        "steps": steps,
+        "2opt": conf.n2Opt() if args.twoOpt else None,
+        "oropt": conf.nOrOpt() if args.oropt else None,
+        "lk": conf.nLinKernighan() if args.lk else None,
+        "finished": conf.finished(),
+        "optimum": None,
+        "gap": None,
+        "lowerBound": None,
+        "boundGap": None,
+    }
+
+    if conf.hasOptimum():
+        result["optimum"] = conf.optimalLength()
+        result["gap"] = length / result["optimum"] - 1
+
+    if args.lowerBound is not None and conf.computeLowerBound(args.lowerBound) is not None:
+        result["lowerBound"] = conf.lowerBound()
+        result["boundGap"] = length / result["lowerBound"] - 1
+
+    if args.tour and conf.finishedFirst:
+        result["tour"] = conf.getTour()
+
+    return result
+
+
+if __name__ == '__main__':
+    json.dump(solve(parseArgs()), sys.stdout)
+    sys.stdout.write("\n")
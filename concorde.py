@@ -0,0 +1,103 @@
+"""Optimal tours by Concorde, run in temporary directories and cached by instance
+
+The cache is content addressed: the key is the hash of the TSPLIB file handed
+to Concorde, so an instance gets its optimum instantly whenever the same file
+is written again, e.g., when a TSPLIB instance or a saved instance is opened.
+"""
+
+import hashlib
+import os
+from subprocess import DEVNULL, TimeoutExpired, run
+import sys
+import tempfile
+
+import numpy as np
+
+# Concorde is expected in the working directory
+EXECUTABLE = "concorde"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tspview", "concorde")
+# seconds a run may take
+TIMEOUT = 600
+
+
+class ConcordeRun:
+    """A run of Concorde on the instance written to `instance`
+
+    The run happens in its own temporary directory, such that parallel runs
+    do not collide. Either `solve` runs it synchronously, or `args` and
+    `dir` are used to start it otherwise (e.g., as a QProcess) and `tour`
+    reads the result.
+    """
+    def __init__(self, executable=EXECUTABLE, cacheDir=CACHE_DIR):
+        self.executable = os.path.abspath(executable)
+        self.cacheDir = cacheDir
+        self.tmp = tempfile.TemporaryDirectory(prefix="concorde")
+        self.dir = self.tmp.name
+        self.instance = os.path.join(self.dir, "instance.tsp")
+        self.args = [self.executable, "-x", "instance.tsp"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def key(self):
+        h = hashlib.sha256()
+        with open(self.instance, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def cachePath(self):
+        return os.path.join(self.cacheDir, self.key() + ".npy")
+
+    def cached(self):
+        """Tour of the cache or None"""
+        try:
+            return np.load(self.cachePath()).tolist()
+        except (OSError, ValueError):
+            return None
+
+    def store(self, tour):
+        path = self.cachePath()
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            tmp = path + ".tmp.npy"
+            np.save(tmp, np.asarray(tour, dtype=np.int32))
+            os.replace(tmp, path)
+        except OSError as e:
+            print("Error while writing {}: {}".format(path, e), file=sys.stderr)
+
+    def tour(self):
+        """Read the tour found by Concorde, raises ValueError if there is none"""
+        try:
+            with open(os.path.join(self.dir, "instance.sol")) as f:
+                N = int(f.readline())
+                tour = [int(j) for i in f.readlines() for j in i.split()]
+        except (OSError, ValueError):
+            raise ValueError("Concorde did not write a tour")
+        if len(tour) != N or sorted(tour) != list(range(N)):
+            raise ValueError("Concorde wrote an invalid tour")
+        self.store(tour)
+        return tour
+
+    def solve(self, timeout=TIMEOUT):
+        """Tour from the cache or by running Concorde, raises ValueError on failure or timeout"""
+        tour = self.cached()
+        if tour is not None:
+            return tour
+        try:
+            run(self.args, cwd=self.dir, stdout=DEVNULL, stderr=DEVNULL, timeout=timeout)
+        except TimeoutExpired:
+            raise ValueError("Concorde did not finish within {} s".format(timeout))
+        except OSError as e:
+            raise ValueError("Concorde could not be started: {}".format(e))
+        return self.tour()
+
+    def close(self):
+        self.tmp.cleanup()
+
+
+def available(executable=EXECUTABLE):
+    return os.path.exists(executable)
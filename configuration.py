@@ -1,58 +1,103 @@
-from math import pi, sin, cos
-import os
-from random import random, randint, choice
-from subprocess import call
-import gzip
+from math import pi
+import sys
+from random import choice
+from time import perf_counter
+
+import numpy as np
 
 from heuristicgenerators import (
     nextNeighborGenerator,
     greedyGenerator,
     farInGenerator,
-    twoOptGenerator,
+    nearInGenerator,
+    cheapInGenerator,
+    randInGenerator,
     randomGenerator,
-    tourFromWays,
-    dist
+    twoOptGenerator
 )
+from localsearch import twoOptNeighborGenerator, twoOptVectorGenerator, orOptGenerator, linKernighanGenerator
+from distanceoracle import distanceOracle
+from lowerbound import EXACT_THRESHOLD, HeldKarp
+from tour import ArrayTour, TourEdges
+import tsplib
+from concorde import ConcordeRun, TIMEOUT as CONCORDE_TIMEOUT
 try:
     from lp.CplexTSPSolver import CplexTSPSolver
 except ImportError:
-    print("can not import LP solver")
+    print("can not import LP solver", file=sys.stderr)
 
 
 class Configuration:
     def __init__(self, x: list = (), y: list = ()):
-        self.__cities = tuple(zip(x, y))
-        self.__ways = []
+        self.__cities = np.column_stack((x, y)).astype(np.float64).reshape(-1, 2)
+        self.__ways = TourEdges(len(self.__cities))
         self.__concordeWays = []
-        self.__distanceMatrix = self.calcDistanceMatrix()
+        self.__shared = None
+        self.__instance = None
+        self.__distances = self.calcDistances()
+        self.__pair = self.__distances.pairFunction()
+        # length of the current ways (or LP relaxation) and of the optimum, kept up to date
+        self.__length = 0.
+        self.__optimalLength = None
+        self.__lowerBound = None
+        self.__neighbors = None
         self.__heuristic = None
         self.__twoOpt = None
+        self.__orOpt = None
+        self.__linKernighan = None
+        self.__tour = None
         self.finishedFirst = True
         self.finished2Opt = True
+        self.finishedOrOpt = True
+        self.finishedLinKernighan = True
         self.do2Opt = False
+        self.doOrOpt = False
+        self.doLinKernighan = False
+        self.twoOptMethod = "Neighbor Lists"
         self.doConcorde = False
+        self.concordeTimeout = CONCORDE_TIMEOUT
         self.currentMethod = "Next Neighbor"
         self.currentEnsemble = "square"
         self.currentFile = ""
         self.TSPLIB = []
         self.__n2Opt = 0
+        self.__nOrOpt = 0
+        self.__nLinKernighan = 0
         self.sigma = 0
         self.N = 42
         self.maxX = 1
         self.maxY = 1
+        # number of candidate neighbors per city for the local search
+        self.candidates = 10
+        # maximal number of 2-opt moves in a Lin-Kernighan chain and time budget in seconds
+        self.linKernighanDepth = 10
+        self.linKernighanTime = 10
 
         self.lp = False
-        self.adjMatrix = [0] * self.N**2
+        self.adjMatrix = []
 
     def init(self):
-        self.__ways = []
+        self.__ways = TourEdges(len(self.__cities))
         self.__concordeWays = []
-        self.__distanceMatrix = self.calcDistanceMatrix()
+        self.__distances = self.calcDistances()
+        self.__pair = self.__distances.pairFunction()
+        self.__length = 0.
+        self.__optimalLength = None
+        self.__lowerBound = None
+        self.__neighbors = None
+        self.__twoOpt = None
+        self.__orOpt = None
+        self.__linKernighan = None
+        self.__tour = None
         self.initMethod()
         self.finishedFirst = False
         self.finished2Opt = False
+        self.finishedOrOpt = False
+        self.finishedLinKernighan = False
         self.__n2Opt = 0
-        self.adjMatrix = [0] * self.N**2
+        self.__nOrOpt = 0
+        self.__nLinKernighan = 0
+        self.adjMatrix = []
 
         if self.doConcorde:
             self.concorde()
@@ -65,7 +110,7 @@ class Configuration:
         elif self.currentEnsemble == "tsplib":
             self.currentFile = choice(self.TSPLIB)
             self.TSPLIBInit(self.currentFile)
-        elif self.currentEnsemble == "custom":
+        elif self.currentEnsemble in ("custom", "shared", "solution"):
             pass
         else:
             raise
@@ -75,93 +120,108 @@ class Configuration:
         self.currentFile = ""
         self.maxX = 1
         self.maxY = 1
-        self.__cities = tuple((random(), random()) for _ in range(self.N))
+        self.__cities = np.random.random((self.N, 2))
         self.init()
 
-    def displace(self, city):
-        r = random() * self.sigma
-        phi = random() * 2 * pi
-        dx = r * cos(phi)
-        dy = r * sin(phi)
+    def displace(self, cities):
+        r = np.random.random(len(cities)) * self.sigma
+        phi = np.random.random(len(cities)) * 2 * pi
 
-        return city[0] + dx, city[1] + dy
+        return cities + np.column_stack((r * np.cos(phi), r * np.sin(phi)))
 
     def DCEInit(self):
         self.currentEnsemble = "dce"
         self.currentFile = ""
         self.maxX = 1
         self.maxY = 1
-        self.__cities = tuple(
-            self.displace((0.5 + 0.25 * cos(2 * pi / self.N * i), 0.5 + 0.25 * sin(2 * pi / self.N * i))) for i in
-            range(self.N))
+        phi = 2 * pi / self.N * np.arange(self.N)
+        self.__cities = self.displace(np.column_stack((0.5 + 0.25 * np.cos(phi), 0.5 + 0.25 * np.sin(phi))))
         self.init()
 
     def getCitiesFromTSPLIB(self, file):
-        tmp = []
-        started = False
-        with gzip.open(file, "rt") as f:
-            for i in f.readlines():
-                if "NODE_COORD_SECTION" in i or "DISPLAY_DATA_SECTION" in i:
-                    started = True
-                    continue
-                if not started:
-                    continue
-                if "EOF" in i:
-                    break
-
-                n, x, y = i.split()
-                tmp.append((float(x), float(y)))
-        return self.adjust_cities(tmp)
+        return tsplib.loadCoordinates(file)
 
     def adjust_cities(self, cities):
-        maxX = max(cities)[0]
-        minX = min(cities)[0]
-        maxY = max(cities, key=lambda x: x[1])[1]
-        minY = min(cities, key=lambda x: x[1])[1]
-        length = max((maxX - minX), (maxY - minY))
-        # y-axis in Qt and TSPLIB are in different directions
-        return tuple(((x - minX) / length, (maxY - y) / length) for x, y in cities)
+        return tsplib.normalizeCoordinates(cities)
 
     def TSPLIBInit(self, file, custom=False):
         self.currentEnsemble = "tsplib" if not custom else "custom"
         self.currentFile = file
-        self.__cities = self.getCitiesFromTSPLIB(file)
-        self.maxX = max(self.__cities)[0]
-        self.maxY = max(self.__cities, key=lambda x: x[1])[1]
+        self.__instance = tsplib.loadInstance(file)
+        self.__cities = self.__instance.cities
+        self.maxX, self.maxY = self.__cities.max(axis=0)
+        self.N = len(self.__cities)
+        self.init()
+
+    def sharedInit(self, instance):
+        """Use an instance of an InstanceStore, including its neighbors and distances"""
+        self.currentEnsemble = "shared"
+        self.currentFile = ""
+        self.__shared = instance
+        self.__cities = instance.cities
+        self.maxX, self.maxY = self.__cities.max(axis=0)
         self.N = len(self.__cities)
         self.init()
 
-    def calcDistanceMatrix(self):
-        return tuple(tuple(dist(i, j) for j in self.__cities) for i in self.__cities)
+    def calcDistances(self):
+        # TSPLIB instances are measured in the metric of their edge weight type
+        if self.__instance is not None and self.currentEnsemble in ("tsplib", "custom"):
+            return self.__instance.distances()
+        if self.__shared is not None and self.currentEnsemble == "shared":
+            return self.__shared.distances()
+        return distanceOracle(self.__cities)
 
     def getCities(self):
         return self.__cities
 
+    def getNeighbors(self):
+        if self.__neighbors is None:
+            shared = self.__shared.neighbors if self.__shared is not None and self.currentEnsemble == "shared" else None
+            if shared is not None and shared.shape[1] >= min(self.candidates, self.N - 1):
+                self.__neighbors = shared[:, :self.candidates]
+            else:
+                self.__neighbors = self.__distances.neighborLists(self.candidates)
+        return self.__neighbors
+
     def getWays(self):
-        return tuple(self.__ways)
+        return self.__ways.ways()
 
     def getWayCoordinates(self):
-        return tuple((self.__cities[i], self.__cities[j]) for i, j in self.__ways)
+        return self.__cities[self.__ways.ways()]
+
+    def getTour(self):
+        """Order of the cities along the current tour, which has to be closed"""
+        return self.__ways.order()
 
     def concordeCoordinates(self):
-        return tuple((self.__cities[i], self.__cities[j]) for i, j in self.__concordeWays)
+        return self.__cities[np.asarray(self.__concordeWays, dtype=np.intp).reshape(-1, 2)]
 
     def valid(self, newWay):
         # raise NotImplementedError
         return True
 
     def removeWay(self, way):
-        try:
-            self.__ways.remove(way)
-        except ValueError:
-            self.__ways.remove((way[1], way[0]))
+        self.__ways.remove(*way)
+        self.__length -= self.__pair(*way)
 
     def addWay(self, way):
         if self.valid(way):
-            self.__ways.append(way)
+            self.__ways.add(*way)
+            self.__length += self.__pair(*way)
         else:
             raise
 
+    def applyMove(self, toRemove, toAdd):
+        for i in toRemove:
+            self.removeWay(i)
+        for i in toAdd:
+            self.addWay(i)
+
+    def setOrder(self, order):
+        """Replace the ways by a closed tour, the length is computed anew"""
+        self.__ways.setOrder(order)
+        self.__length = self.waysLength(self.getWays())
+
     def initMethod(self):
         self.changeMethod(self.currentMethod)
 
@@ -170,17 +230,25 @@ class Configuration:
             self.__heuristic = self.cuttingPlanes()
             self.lp = True
             self.do2Opt = False
+            self.doOrOpt = False
+            self.doLinKernighan = False
         else:
             self.lp = False
 
             if method == "Nearest Neighbor":
-                self.__heuristic = nextNeighborGenerator(self.__cities, self.getWays())
+                self.__heuristic = nextNeighborGenerator(self.__cities, self.getWays(), self.__distances)
             elif method == "Greedy":
-                self.__heuristic = greedyGenerator(self.__cities, self.getWays())
+                self.__heuristic = greedyGenerator(self.__cities, self.getWays(), self.__distances)
             elif method == "Farthest Insertion":
-                self.__heuristic = farInGenerator(self.__cities, self.getWays())
+                self.__heuristic = farInGenerator(self.__cities, self.getWays(), self.__distances)
+            elif method == "Nearest Insertion":
+                self.__heuristic = nearInGenerator(self.__cities, self.getWays(), self.__distances)
+            elif method == "Cheapest Insertion":
+                self.__heuristic = cheapInGenerator(self.__cities, self.getWays(), self.__distances)
+            elif method == "Random Insertion":
+                self.__heuristic = randInGenerator(self.__cities, self.getWays(), self.__distances)
             elif method == "Random":
-                self.__heuristic = randomGenerator(self.__cities, self.getWays())
+                self.__heuristic = randomGenerator(self.__cities, self.getWays(), self.__distances)
             else:
                 self.__heuristic = None
 
@@ -198,53 +266,258 @@ class Configuration:
         if self.lp and not self.finishedFirst:
             try:
                 self.adjMatrix = next(self.__heuristic)
+                self.__length = self.lpLength()
             except StopIteration:
                 self.finishedFirst = True
 
         elif not self.finishedFirst:
             try:
                 toRemove, toAdd = next(self.__heuristic)
-                for i in toRemove:
-                    self.removeWay(i)
-                for i in toAdd:
-                    self.addWay(i)
+                self.applyMove(toRemove, toAdd)
             except StopIteration:
                 self.finishedFirst = True
-                self.__twoOpt = twoOptGenerator(tourFromWays(self.__ways), self.__distanceMatrix)
-                pass
 
         elif self.do2Opt and not self.finished2Opt:
+            if self.__twoOpt is None:
+                self.startTwoOpt()
             try:
                 toRemove, toAdd = next(self.__twoOpt)
                 self.__n2Opt += 1
-                for i in toRemove:
-                    self.removeWay(i)
-                for i in toAdd:
-                    self.addWay(i)
+                self.applyMove(toRemove, toAdd)
             except StopIteration:
                 self.finished2Opt = True
 
-    def length(self):
-        len = 0
-        if self.lp:
-            c = self.getCities()
-            for i in range(self.N):
-                for j in range(i):
-                    len += self.adjMatrix[i * self.N + j] * dist(c[i], c[j])
+        elif self.doOrOpt and not self.finishedOrOpt:
+            # Or-opt runs after the 2-opt, if both are enabled
+            if self.__orOpt is None:
+                self.startOrOpt()
+            try:
+                toRemove, toAdd = next(self.__orOpt)
+                self.__nOrOpt += 1
+                self.applyMove(toRemove, toAdd)
+            except StopIteration:
+                self.finishedOrOpt = True
+
+        elif self.doLinKernighan and not self.finishedLinKernighan:
+            if self.__linKernighan is None:
+                self.startLinKernighan()
+            try:
+                toRemove, toAdd = next(self.__linKernighan)
+                self.__nLinKernighan += 1
+                self.applyMove(toRemove, toAdd)
+            except StopIteration:
+                self.finishedLinKernighan = True
+
+    def finished(self):
+        return (self.finishedFirst
+                and (not self.do2Opt or self.finished2Opt)
+                and (not self.doOrOpt or self.finishedOrOpt)
+                and (not self.doLinKernighan or self.finishedLinKernighan))
+
+    def startTwoOpt(self):
+        # later local searches have to start from the improved tour
+        self.__orOpt = None
+        self.__linKernighan = None
+        if self.twoOptMethod == "First Improvement":
+            # works on its own list, the ways are only updated by the yielded moves
+            self.__tour = None
+            t = self.getTour()
+            self.__twoOpt = twoOptGenerator(t + t[:1], self.__distances)
+            return
+
+        self.__tour = ArrayTour(self.getTour())
+        if self.twoOptMethod == "Vectorized":
+            self.__twoOpt = twoOptVectorGenerator(self.__tour, self.__distances)
         else:
-            for a, b in self.getWayCoordinates():
-                len += dist(a, b)
-        return len
+            self.__twoOpt = twoOptNeighborGenerator(self.__tour, self.__distances, self.getNeighbors())
+
+    def startOrOpt(self):
+        # the other local searches work on the replaced tour, they restart from the ways
+        self.__twoOpt = None
+        self.__linKernighan = None
+        self.__tour = ArrayTour(self.getTour())
+        self.__orOpt = orOptGenerator(self.__tour, self.__distances, self.getNeighbors())
+
+    def startLinKernighan(self):
+        self.__twoOpt = None
+        self.__orOpt = None
+        self.__tour = ArrayTour(self.getTour())
+        self.__linKernighan = linKernighanGenerator(self.__tour, self.__distances, self.getNeighbors(),
+                                                    self.linKernighanDepth, self.linKernighanTime)
+
+    def finish(self):
+        """Run to completion, local search moves are applied to the ways only at the end"""
+        self.solve()
+
+    def solve(self, method=None, postOpt=None, timeLimit=None, targetGap=None, callback=None, interval=0.5,
+              stop=None):
+        """Run the construction and the post-optimizations until they are finished or a limit is reached
+
+        `postOpt` names the post-optimizations to use ("2-opt", "Or-opt",
+        "Lin-Kernighan"), otherwise the current settings are kept. The run
+        stops after `timeLimit` seconds or as soon as the tour is within
+        `targetGap` of the optimum, which needs Concorde. A later call (or
+        step) continues where it stopped.
+
+        `callback(elapsed, length, moves)` is called about every `interval`
+        seconds and at the end. Returns the same (elapsed, length, moves).
+        The run also stops as soon as `stop()` returns True, e.g., when the
+        thread running it is interrupted.
+        """
+        if method is not None and method != self.currentMethod:
+            self.changeMethod(method)
+        if postOpt is not None:
+            self.do2Opt = "2-opt" in postOpt
+            self.doOrOpt = "Or-opt" in postOpt
+            self.doLinKernighan = "Lin-Kernighan" in postOpt
+        if targetGap is not None and not self.__concordeWays:
+            raise ValueError("a target gap needs the optimum")
+
+        start = perf_counter()
+        lastReport = start
+        moves = 0
+
+        def limitReached(length):
+            nonlocal lastReport
+            now = perf_counter()
+            if callback is not None and now - lastReport >= interval:
+                lastReport = now
+                callback(now - start, length, moves)
+            if timeLimit is not None and now - start >= timeLimit:
+                return True
+            if stop is not None and stop():
+                return True
+            return targetGap is not None and self.finishedFirst and length <= (1 + targetGap) * self.optimalLength()
+
+        def localSearch(generator):
+            """Moves of a local search, they are applied to the ways only if there is no ArrayTour"""
+            nonlocal moves
+            length = self.__length
+            n = 0
+            for toRemove, toAdd in generator:
+                n += 1
+                moves += 1
+                if self.__tour is None:
+                    self.applyMove(toRemove, toAdd)
+                    length = self.__length
+                else:
+                    length += sum(self.__pair(*e) for e in toAdd) - sum(self.__pair(*e) for e in toRemove)
+                if limitReached(length):
+                    return n, True
+            return n, False
+
+        stopped = False
+        while not self.finishedFirst and not stopped:
+            # not the step of a view, which would redraw the tour after every step
+            if Configuration.step(self):
+                stopped = True
+                break
+            moves += 1
+            stopped = limitReached(self.__length)
+
+        if not stopped and self.do2Opt and not self.finished2Opt:
+            if self.__twoOpt is None:
+                self.startTwoOpt()
+            n, stopped = localSearch(self.__twoOpt)
+            self.__n2Opt += n
+            if self.__tour is not None:
+                self.setOrder(self.__tour.order)
+            self.finished2Opt = not stopped
+
+        if not stopped and self.doOrOpt and not self.finishedOrOpt:
+            if self.__orOpt is None:
+                self.startOrOpt()
+            n, stopped = localSearch(self.__orOpt)
+            self.__nOrOpt += n
+            self.setOrder(self.__tour.order)
+            self.finishedOrOpt = not stopped
+
+        if not stopped and self.doLinKernighan and not self.finishedLinKernighan:
+            if self.__linKernighan is None:
+                self.startLinKernighan()
+            n, stopped = localSearch(self.__linKernighan)
+            self.__nLinKernighan += n
+            self.setOrder(self.__tour.order)
+            self.finishedLinKernighan = not stopped
+
+        elapsed = perf_counter() - start
+        if callback is not None:
+            callback(elapsed, self.length(), moves)
+        return elapsed, self.length(), moves
+
+    def waysLength(self, ways):
+        w = np.asarray(ways, dtype=np.intp).reshape(-1, 2)
+        return float(self.__distances.exact(w[:, 0], w[:, 1]).sum())
+
+    def lpLength(self):
+        """Length of the current LP relaxation, the weighted sum over its edges"""
+        if not self.adjMatrix:
+            return 0.
+        a = np.tril(np.asarray(self.adjMatrix, dtype=np.float64).reshape(self.N, self.N), -1)
+        i, j = np.nonzero(a)
+        return float((a[i, j] * self.__distances.exact(i, j)).sum())
+
+    def length(self):
+        return self.__length
+
+    def hasOptimum(self):
+        return bool(self.__concordeWays)
 
     def optimalLength(self):
-        len = 0
-        for a, b in self.concordeCoordinates():
-            len += dist(a, b)
-        return len
+        if not self.__concordeWays:
+            return None
+        if self.__optimalLength is None:
+            self.__optimalLength = self.waysLength(self.__concordeWays)
+        return self.__optimalLength
+
+    def lowerBound(self):
+        """Best Held-Karp bound found so far or None"""
+        return self.__lowerBound
+
+    def setLowerBound(self, bound):
+        self.__lowerBound = bound
+
+    def lowerBoundIsExact(self):
+        """Whether lowerBound() is a true bound, not an estimate from candidate edges"""
+        return len(self.__distances) <= EXACT_THRESHOLD
+
+    def heldKarpFactory(self):
+        """Function building the Held-Karp bound engine of the instance (see lowerbound.py)
+
+        Building it takes a while for large instances. The function does not
+        touch the configuration, such that it can be called in another
+        thread. A complete tour sets the step sizes.
+        """
+        d = self.__distances
+        neighbors = self.__neighbors
+        candidates = self.candidates
+        upper = self.length() if self.finishedFirst and not self.lp and len(self.__ways) else None
+
+        def build():
+            nl = neighbors
+            if nl is None and len(d) > EXACT_THRESHOLD:
+                nl = d.neighborLists(candidates)
+            return HeldKarp(d, nl, upper)
+        return build
+
+    def computeLowerBound(self, timeLimit=None):
+        """Run the subgradient optimization until it converges or `timeLimit` seconds passed"""
+        start = perf_counter()
+        for bound in self.heldKarpFactory()().bounds():
+            self.__lowerBound = bound
+            if timeLimit is not None and perf_counter() - start >= timeLimit:
+                break
+        return self.__lowerBound
 
     def n2Opt(self):
         return self.__n2Opt
 
+    def nOrOpt(self):
+        return self.__nOrOpt
+
+    def nLinKernighan(self):
+        return self.__nLinKernighan
+
     def setN(self, N):
         if N < 3:
             return
@@ -258,41 +531,79 @@ class Configuration:
     def setDo2Opt(self, b):
         self.do2Opt = b
 
+    def setDoOrOpt(self, b):
+        self.doOrOpt = b
+
+    def setDoLinKernighan(self, b):
+        self.doLinKernighan = b
+
+    def setTwoOptMethod(self, method: str):
+        # a running 2-opt is finished with the old method
+        self.twoOptMethod = method
+
     def setDoConcorde(self, b):
         self.doConcorde = b
         if b:
             self.concorde()
 
     def clearSolution(self):
-        self.__ways = []
-        self.adjMatrix = [0] * self.N**2
+        self.__ways.clear()
+        self.__length = 0.
+        self.__twoOpt = None
+        self.__orOpt = None
+        self.__linKernighan = None
+        self.__tour = None
+        self.adjMatrix = []
         self.__n2Opt = 0
+        self.__nOrOpt = 0
+        self.__nLinKernighan = 0
         self.finishedFirst = False
         self.finished2Opt = False
+        self.finishedOrOpt = False
+        self.finishedLinKernighan = False
         self.initMethod()
 
     def saveTSPLIB(self, name):
         if self.currentFile:
-            with gzip.open(self.currentFile, "rt") as read:
-                with open(name, "w") as f:
-                    f.write(read.read())
+            tsplib.copyTSPLIB(self.currentFile, name)
         else:
-            tsplib = "COMMENT : Random Euclidian (Schawe)\n"
-            tsplib += "TYPE : TSP\n"
-            tsplib += "DIMENSION : {}\n".format(len(self.__cities))
-            tsplib += "EDGE_WEIGHT_TYPE : EUC_2D\n"
-            tsplib += "NODE_COORD_SECTION\n"
-
-            for n, coord in enumerate(self.__cities, start=1):
-                x, y = coord
-                tsplib += "{} {} {}\n".format(n, x * 10 ** 5, y * 10 ** 5)
-
-            with open(name, "w") as f:
-                f.write(tsplib)
+            tsplib.writeTSPLIB(name, self.__cities)
 
     def loadTSPLIB(self, name):
         self.TSPLIBInit(name, custom=True)
 
+    def completeTour(self):
+        if self.lp or not self.finishedFirst or not len(self.__ways) or len(self.__ways) != len(self.__cities):
+            raise ValueError("there is no complete tour")
+        return self.getTour()
+
+    def saveTour(self, name):
+        tsplib.writeTour(name, self.completeTour())
+
+    def loadTour(self, name):
+        """Show a TSPLIB tour of the current instance, it can be improved further"""
+        tour = tsplib.readTour(name)
+        if self.lp or sorted(tour) != list(range(len(self.__cities))):
+            raise ValueError("{} is not a tour of this instance".format(name))
+        self.clearSolution()
+        self.setOrder(tour)
+        self.finishedFirst = True
+
+    def saveSolution(self, name):
+        """Save the instance together with the current tour in binary form"""
+        tsplib.saveSolution(name, self.__cities, self.completeTour())
+
+    def loadSolution(self, name):
+        cities, tour = tsplib.loadSolution(name)
+        self.currentEnsemble = "solution"
+        self.currentFile = ""
+        self.__cities = cities
+        self.maxX, self.maxY = self.__cities.max(axis=0)
+        self.N = len(self.__cities)
+        self.init()
+        self.setOrder(tour)
+        self.finishedFirst = True
+
     def concorde(self):
         # do not optimize for competition
         if self.currentEnsemble == "custom":
@@ -301,25 +612,19 @@ class Configuration:
             # we already have the optimum
             return
 
-        name = "%06d" % randint(0, 10 ** 6)
-        self.saveTSPLIB(name)
-        call(["./concorde", "-x", "-v", name])
-        with open(name + ".sol") as f:
-            _ = int(f.readline())
-            tour = [int(j) for i in f.readlines() for j in i.split()]
-        os.remove(name)
-        os.remove(name + ".sol")
-
-        prev = tour[0]
-        for i in tour[1:]:
-            self.__concordeWays.append((prev, i))
-            prev = i
-        self.__concordeWays.append((tour[-1], tour[0]))
+        with ConcordeRun() as run:
+            self.saveTSPLIB(run.instance)
+            try:
+                self.setOptimalTour(run.solve(self.concordeTimeout))
+            except ValueError as e:
+                print(e, file=sys.stderr)
+
+    def setOptimalTour(self, tour):
+        self.__concordeWays = list(zip(tour, tour[1:] + tour[:1]))
+        self.__optimalLength = None
 
     def cuttingPlanes(self):
-        # flatten distance matrix
-        d = [i for j in self.__distanceMatrix for i in j]
-        c = CplexTSPSolver(self.N, d)
+        c = CplexTSPSolver(self.N, self.__distances.flat())
         adjMatrix = c.nextRelaxation()
         while adjMatrix:
             yield adjMatrix
@@ -0,0 +1,224 @@
+from collections import OrderedDict
+from math import hypot
+
+import numpy as np
+
+from spatialindex import neighborLists
+
+# up to this many cities the upper triangle is stored (N^2 / 2 float32 values)
+TRIANGLE_THRESHOLD = 5000
+# number of full rows the lazy oracle keeps around
+ROW_CACHE_SIZE = 256
+
+
+class DistanceOracle:
+    """Answers distance queries between cities
+
+    `d[i, j]` accepts integers as well as (broadcastable) index arrays and
+    `d.row(i)` returns the distances of city `i` to all cities. Results are
+    always float64, regardless of the storage used by the implementation.
+
+    Without a `metric` (see metrics.py) these are the euclidean distances of
+    the cities, otherwise the metric is evaluated on `coords`, the original
+    coordinates of a TSPLIB instance.
+    """
+    def __init__(self, cities, metric=None, coords=None):
+        self.cities = np.asarray(cities, dtype=np.float64).reshape(-1, 2)
+        self.N = len(self.cities)
+        self.metric = metric
+        self.points = None if metric is None else metric.prepare(coords)
+        # whether the nearest cities can be found by their positions
+        self.euclidean = metric is None or metric.euclidean
+
+    def __len__(self):
+        return self.N
+
+    def __getitem__(self, idx):
+        i, j = idx
+        return self.lookup(np.asarray(i, dtype=np.intp), np.asarray(j, dtype=np.intp))
+
+    def lookup(self, i, j):
+        return self.exact(i, j)
+
+    def exact(self, i, j):
+        """Distances in full precision, computed from the coordinates"""
+        if self.metric is not None:
+            return self.metric.vector(self.points[i], self.points[j])
+        a = self.cities[i]
+        b = self.cities[j]
+        return np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1])
+
+    def row(self, i):
+        return self.exact(i, slice(None))
+
+    def pairFunction(self):
+        """Plain function (i, j) -> distance, the fastest way for single pairs"""
+        if self.metric is not None:
+            x = self.points[:, 0].tolist()
+            y = self.points[:, 1].tolist()
+            scalar = self.metric.scalar
+
+            def f(i, j):
+                return scalar(x[i], y[i], x[j], y[j])
+            return f
+
+        x = self.cities[:, 0].tolist()
+        y = self.cities[:, 1].tolist()
+
+        def f(i, j):
+            return hypot(x[i] - x[j], y[i] - y[j])
+        return f
+
+    def neighborLists(self, k):
+        """(N, k) array of the k nearest other cities of every city, nearest first"""
+        if self.euclidean:
+            return neighborLists(self.cities, k)
+
+        k = max(0, min(k, self.N - 1))
+        out = np.empty((self.N, k), dtype=np.intp)
+        if not k:
+            return out
+        for i in range(self.N):
+            r = np.array(self.row(i))
+            r[i] = np.inf
+            idx = np.argpartition(r, k - 1)[:k]
+            # ties are resolved by the index, like in the spatial index
+            out[i] = idx[np.lexsort((idx, r[idx]))]
+        return out
+
+    def triangle(self):
+        """All distances d[i, j] with i < j, row by row"""
+        return np.concatenate([self.row(i)[i + 1:] for i in range(self.N)] + [np.empty(0)])
+
+    def pairFromIndex(self, k):
+        """Map positions of `triangle()` back to pairs (i, j) with i < j"""
+        k = np.asarray(k, dtype=np.intp)
+        i = np.searchsorted(self.rowStarts(), k, side="right") - 1
+        j = k - self.rowStarts()[i] + i + 1
+        return i, j
+
+    def rowStarts(self):
+        i = np.arange(self.N, dtype=np.intp)
+        return i * self.N - i * (i + 1) // 2
+
+    def flat(self):
+        """Read-only view of the full row-major matrix, without building it"""
+        return FlatDistances(self)
+
+
+class FlatDistances:
+    def __init__(self, oracle):
+        self.oracle = oracle
+
+    def __len__(self):
+        return self.oracle.N ** 2
+
+    def __getitem__(self, k):
+        i, j = divmod(k, self.oracle.N)
+        return float(self.oracle[i, j])
+
+
+class TriangularDistances(DistanceOracle):
+    """Stores the strict upper triangle of the distance matrix in float32
+
+    An already computed triangle, e.g., in shared memory, can be passed as `tri`.
+    """
+    def __init__(self, cities, tri=None, metric=None, coords=None):
+        super().__init__(cities, metric, coords)
+        self.starts = super().rowStarts()
+        # position of (i, j) in the triangle is offset[i] + j
+        self.offset = self.starts - np.arange(self.N) - 1
+        if tri is not None:
+            self.tri = tri
+            return
+        self.tri = np.empty(self.N * (self.N - 1) // 2, dtype=np.float32)
+        for i in range(self.N - 1):
+            s = self.starts[i]
+            self.tri[s:s + self.N - i - 1] = self.exact(i, slice(i + 1, None))
+
+    def rowStarts(self):
+        return self.starts
+
+    def lookup(self, i, j):
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+        if not self.tri.size:
+            return np.zeros(lo.shape)
+        # for lo == hi this points to some valid entry, which is overwritten below
+        r = np.array(self.tri[self.offset[lo] + hi], dtype=np.float64)
+        r[lo == hi] = 0.
+        return r
+
+    def row(self, i):
+        r = np.empty(self.N)
+        lower = np.arange(i)
+        r[:i] = self.tri[self.starts[lower] + i - lower - 1]
+        r[i] = 0.
+        s = self.starts[i]
+        r[i + 1:] = self.tri[s:s + self.N - i - 1]
+        return r
+
+    def triangle(self):
+        return self.tri
+
+
+class ExplicitDistances(TriangularDistances):
+    """Distances given by the upper triangle of the matrix of an EXPLICIT TSPLIB instance
+
+    The triangle is kept in its own, usually integer, type. The cities are
+    only used for drawing.
+    """
+    def __init__(self, cities, tri):
+        super().__init__(cities, tri)
+        self.euclidean = False
+
+    def exact(self, i, j):
+        return self.lookup(np.asarray(i, dtype=np.intp), np.asarray(j, dtype=np.intp))
+
+    def pairFunction(self):
+        tri = self.tri.tolist()
+        offset = self.offset.tolist()
+
+        def f(i, j):
+            if i == j:
+                return 0.
+            if i > j:
+                i, j = j, i
+            return tri[offset[i] + j]
+        return f
+
+
+class LazyDistances(DistanceOracle):
+    """Computes distances on demand and caches the most recently used rows"""
+    def __init__(self, cities, cacheSize=ROW_CACHE_SIZE, metric=None, coords=None):
+        super().__init__(cities, metric, coords)
+        self.cacheSize = cacheSize
+        self.cache = OrderedDict()
+
+    def row(self, i):
+        i = int(i)
+        try:
+            self.cache.move_to_end(i)
+            return self.cache[i]
+        except KeyError:
+            r = super().row(i)
+            r.flags.writeable = False
+            self.cache[i] = r
+            if len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+            return r
+
+
+def distanceOracle(cities, threshold=TRIANGLE_THRESHOLD, metric=None, coords=None, weights=None, tri=None):
+    """Oracle for the euclidean distances of the cities or a TSPLIB instance
+
+    For a TSPLIB instance either `metric` and `coords` or, for EXPLICIT
+    instances, the upper triangle `weights` are given. An already computed
+    triangle `tri` is used regardless of the threshold.
+    """
+    if weights is not None:
+        return ExplicitDistances(cities, weights)
+    if tri is not None or len(cities) <= threshold:
+        return TriangularDistances(cities, tri, metric, coords)
+    else:
+        return LazyDistances(cities, metric=metric, coords=coords)
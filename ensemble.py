@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Run many instances of all heuristics in parallel and collect statistics
+
+    python3 ensemble.py -N 100 1000 --samples 1000 --2opt -o square.csv
+    python3 ensemble.py --ensemble dce -N 500 --sigma 0 5 10 --methods Greedy Random
+    python3 ensemble.py --tsplib TSPLIB/*.tsp.gz --concorde
+
+Every result is folded into running statistics per (method, N, sigma) as
+soon as it arrives, so memory does not grow with the number of samples.
+"""
+
+import argparse
+import csv
+from multiprocessing import Pool
+import os
+import sys
+
+from cli import METHODS, parseArgs, solve
+from instancestore import InstanceStore, SharedInstance
+import tsplib
+
+# instances a worker process is attached to, by name
+attached = {}
+
+
+class RunningStats:
+    """Mean and variance of a stream of values (Welford's algorithm)"""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+
+    def push(self, x):
+        if x is None:
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def variance(self):
+        """Unbiased sample variance"""
+        return self.m2 / (self.n - 1) if self.n > 1 else 0.
+
+    def stderr(self):
+        return (self.variance() / self.n) ** 0.5 if self.n else 0.
+
+
+def tasks(args, handles):
+    """Command lines for cli.solve of all instances with the handles of published instances
+
+    Every run gets its own seed, which also fixes the tours of the random
+    construction methods.
+    """
+    options = []
+    if args.twoOpt:
+        options += ["--2opt", "--2opt-method", args.twoOptMethod]
+    if args.oropt:
+        options.append("--oropt")
+    if args.lk:
+        options.append("--lk")
+    if args.concorde:
+        options.append("--concorde")
+    if args.timeLimit is not None:
+        options += ["--time-limit", str(args.timeLimit)]
+
+    seed = args.seed
+    for method in args.methods:
+        if args.tsplib:
+            for f in args.tsplib:
+                yield ["--tsplib", f, "--seed", str(seed), "--method", method] + options, handles[f]
+                seed += 1
+            continue
+        for N in args.N:
+            for sigma in args.sigma:
+                for _ in range(args.samples):
+                    yield ["--ensemble", args.ensemble, "-N", str(N), "--sigma", str(sigma),
+                           "--seed", str(seed), "--method", method] + options, None
+                    seed += 1
+
+
+def work(task):
+    argv, handle = task
+    args = parseArgs(argv)
+    shared = None
+    if handle is not None:
+        if handle["name"] not in attached:
+            attached[handle["name"]] = SharedInstance.attach(handle)
+        shared = attached[handle["name"]]
+    result = solve(args, shared)
+    # TSPLIB instances are not displaced
+    result["sigma"] = 0. if args.tsplib else args.sigma
+    return result
+
+
+def run(args):
+    stats = {}
+    with InstanceStore() as store:
+        # TSPLIB files are parsed once, the workers attach to the shared instances
+        handles = {}
+        for f in args.tsplib or ():
+            instance = tsplib.loadInstance(f)
+            handles[f] = store.publish(f, instance.cities, edgeWeightType=instance.edgeWeightType,
+                                       coords=instance.coords, weights=instance.weights)
+        with Pool(args.processes) as pool:
+            for n, result in enumerate(pool.imap_unordered(work, tasks(args, handles), chunksize=args.chunksize),
+                                       start=1):
+                key = result["method"], result["N"], result["sigma"]
+                if key not in stats:
+                    stats[key] = {"length": RunningStats(), "gap": RunningStats(), "time": RunningStats()}
+                for q, s in stats[key].items():
+                    s.push(result[q])
+                if args.verbose and n % 100 == 0:
+                    print("{} instances done".format(n), file=sys.stderr)
+    return stats
+
+
+def writeCSV(stats, f):
+    quantities = ("length", "gap", "time")
+    w = csv.writer(f)
+    w.writerow(["method", "N", "sigma", "samples"]
+               + ["{}_{}".format(q, s) for q in quantities for s in ("mean", "var", "stderr")])
+    for (method, N, sigma), s in sorted(stats.items()):
+        row = [method, N, sigma, s["length"].n]
+        for q in quantities:
+            if s[q].n:
+                row += [repr(s[q].mean), repr(s[q].variance()), repr(s[q].stderr())]
+            else:
+                row += ["", "", ""]
+        w.writerow(row)
+
+
+def parseEnsembleArgs(args=None):
+    parser = argparse.ArgumentParser(description="Collect statistics of TSP heuristics over many instances.")
+    parser.add_argument("--tsplib", metavar="FILE", nargs="+", help="TSPLIB instances instead of a random ensemble")
+    parser.add_argument("--ensemble", choices=["square", "dce"], default="square")
+    parser.add_argument("-N", type=int, nargs="+", default=[100])
+    parser.add_argument("--sigma", type=float, nargs="+", default=[0.])
+    parser.add_argument("--samples", type=int, default=100, help="random instances per (method, N, sigma)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=METHODS)
+    parser.add_argument("--2opt", dest="twoOpt", action="store_true")
+    parser.add_argument("--2opt-method", dest="twoOptMethod", default="Neighbor Lists",
+                        choices=["Neighbor Lists", "Vectorized", "First Improvement"])
+    parser.add_argument("--oropt", action="store_true")
+    parser.add_argument("--lk", action="store_true")
+    parser.add_argument("--concorde", action="store_true", help="record the gap, needs ./concorde")
+    parser.add_argument("--time-limit", dest="timeLimit", type=float, metavar="SECONDS",
+                        help="time limit of every run")
+    parser.add_argument("-j", "--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=4)
+    parser.add_argument("-o", "--output", help="CSV file, default is stdout")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    return parser.parse_args(args)
+
+
+if __name__ == '__main__':
+    args = parseEnsembleArgs()
+    stats = run(args)
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writeCSV(stats, f)
+    else:
+        writeCSV(stats, sys.stdout)
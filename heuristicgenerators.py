@@ -1,51 +1,36 @@
-from math import sqrt
 from random import shuffle
-import heapq
 
-from unionfind import UnionFindWrapper
+import numpy as np
 
+from unionfind import ArrayUnionFind
+from spatialindex import KDTree
 
-def dist(a: tuple, b: tuple):
-    return sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
 
-
-def argmax(iterable):
-    return max(enumerate(iterable), key=lambda x: x[1])
-
-
-def argmin(iterable):
-    return min(enumerate(iterable), key=lambda x: x[1])
-
-
-def tourFromWays(ways_in):
-    ways = list(ways_in)
-    tour = []
-    start = ways.pop()
-    tour.append(start[0])
-    tour.append(start[1])
-    while ways:
-        for n in range(len(ways)):
-            i, j = ways[n]
-            if i == tour[-1]:
-                tour.append(j)
-                ways.pop(n)
-                break
-            elif j == tour[-1]:
-                tour.append(i)
-                ways.pop(n)
-                break
-    return tour
-
-
-def nextNeighborGenerator(cities, ways):
+def nextNeighborGenerator(cities, ways, d):
     if len(cities) <= 1:
         raise ValueError
 
-    candidates = list(range(1, len(cities)))
+    if not d.euclidean:
+        # the nearest city can not be found by its position, scan its row
+        visited = np.zeros(len(cities), dtype=bool)
+        visited[0] = True
+        tour = [0]
+        for _ in range(len(cities) - 1):
+            r = np.array(d.row(tour[-1]))
+            r[visited] = np.inf
+            nextIdx = int(np.argmin(r))
+            visited[nextIdx] = True
+            yield (), ((tour[-1], nextIdx),)
+            tour.append(nextIdx)
+        yield (), ((tour[-1], tour[0]),)
+        return
+
+    candidates = KDTree(cities)
+    candidates.remove(0)
     tour = [0]
 
-    while candidates:
-        nextIdx = candidates[argmin(dist(cities[i], cities[tour[-1]]) for i in candidates)[0]]
+    while len(candidates):
+        nextIdx = candidates.nearest(*cities[tour[-1]])
 
         candidates.remove(nextIdx)
         yield (), ((tour[-1], nextIdx),)
@@ -54,60 +39,191 @@ def nextNeighborGenerator(cities, ways):
     yield (), ((tour[-1], tour[0]),)
 
 
-def greedyGenerator(cities, ways):
-    heap = [(dist(cities[i], cities[j]), (i, j)) for i in range(len(cities)) for j in range(i)]
-    heapq.heapify(heap)
+def candidateEdges(cities, d, k):
+    """Edges (i, j) with j < i to the k nearest neighbors in order of increasing length"""
+    N = len(cities)
+    nl = d.neighborLists(k)
+    i = np.repeat(np.arange(N), nl.shape[1])
+    j = nl.ravel()
+    key = np.unique(np.maximum(i, j) * N + np.minimum(i, j))
+    i, j = np.divmod(key, N)
+    # stable, such that ties are resolved in lexicographic order of (i, j)
+    order = np.argsort(d[i, j], kind="stable")
+    return zip(i[order].tolist(), j[order].tolist())
+
+
+def joinFragments(cities, adj):
+    """Join the paths of a partial tour into a single path
+
+    Starting at a free end, the walk always continues to the closest free
+    end of another fragment and then jumps to that fragment's other end.
+    """
+    N = len(adj)
+    # the other end of the fragment for every free end
+    other = {}
+    for s in range(N):
+        if len(adj[s]) < 2 and s not in other:
+            prev, cur = -1, s
+            while len(adj[cur]) == 2 or (prev < 0 and adj[cur]):
+                prev, cur = cur, adj[cur][0] if adj[cur][0] != prev else adj[cur][1]
+            other[s] = cur
+            other[cur] = s
+
+    ends = KDTree(cities)
+    for i in range(N):
+        if len(adj[i]) == 2:
+            ends.remove(i)
+
+    start = min(other)
+    cur = other[start]
+    ends.remove(start)
+    ends.remove(cur)
+    while len(ends):
+        nxt = ends.nearest(*cities[cur])
+        ends.remove(nxt)
+        ends.remove(other[nxt])
+        yield max(cur, nxt), min(cur, nxt)
+        cur = other[nxt]
+
+
+def greedyGenerator(cities, ways, d, k=10, joinLimit=2000):
+    N = len(cities)
+    adj = [[] for _ in range(N)]
 
     ctr = 0
-    valid, lastEdge = tourStaysValid(len(cities))
-    while heap:
-        d, edge = heapq.heappop(heap)
+    valid, lastEdge = tourStaysValid(N)
+    for edge in candidateEdges(cities, d, k):
+        if ctr == N - 1:
+            break
         if valid(edge):
+            i, j = edge
+            adj[i].append(j)
+            adj[j].append(i)
             yield (), (edge,)
             ctr += 1
-            if ctr == len(cities) - 1:
+
+    # not every greedy edge is between candidates, continue greedily on the
+    # free ends of the fragments if there are not too many of them
+    free = np.array([i for i in range(N) if len(adj[i]) < 2], dtype=np.intp)
+    if ctr < N - 1 and len(free) <= joinLimit:
+        i, j = np.tril_indices(len(free), -1)
+        i, j = free[i], free[j]
+        order = np.argsort(d[i, j], kind="stable")
+        for edge in zip(i[order].tolist(), j[order].tolist()):
+            if ctr == N - 1:
                 break
+            if valid(edge):
+                yield (), (edge,)
+                ctr += 1
+
+    if ctr < N - 1:
+        for edge in joinFragments(cities, adj):
+            valid(edge)
+            yield (), (edge,)
 
     yield (), (lastEdge(),)
 
 
-def farInGenerator(cities, ways):
-    candidates = set(range(1, len(cities)))
-    tour = [0]
+def insertionGenerator(cities, ways, d, rule):
+    """Grow a subtour by inserting one city at a time at its cheapest position
+
+    The next city is the one "farthest" from or "nearest" to the subtour, a
+    "random" one or the one which is "cheapest" to insert.
+    """
+    N = len(cities)
+    if N <= 1:
+        return
+
+    # the subtour is stored as successors, edgeLen[i] is the length of (i, succ[i])
+    succ = np.full(N, -1, dtype=np.intp)
+    edgeLen = np.zeros(N)
+    nodes = np.zeros(N, dtype=np.intp)
+    pos = np.zeros(N, dtype=np.intp)
+    m = 1
+    outside = np.ones(N, dtype=bool)
+    outside[0] = False
+
+    # distance of every city to the subtour
+    minDist = d.row(0).copy()
+    # cheapest insertion cost of every city and the edge (bestEdge, succ[bestEdge]) to insert into
+    cost = 2 * minDist
+    bestEdge = np.zeros(N, dtype=np.intp)
+    order = list(range(1, N))
+    shuffle(order)
+
+    for step in range(N - 1):
+        if rule == "farthest":
+            city = int(np.argmax(np.where(outside, minDist, -1.)))
+        elif rule == "nearest":
+            city = int(np.argmin(np.where(outside, minDist, np.inf)))
+        elif rule == "cheapest":
+            city = int(np.argmin(np.where(outside, cost, np.inf)))
+        elif rule == "random":
+            city = order[step]
+        else:
+            raise ValueError(rule)
+        outside[city] = False
+        r = d.row(city)
+
+        t = nodes[:m]
+        if m == 1:
+            a = b = int(t[0])
+            yield (), ((a, city), (a, city))
+        else:
+            if rule == "cheapest":
+                a = int(bestEdge[city])
+            else:
+                a = int(t[np.argmin(r[t] + r[succ[t]] - edgeLen[t])])
+            b = int(succ[a])
+            yield ((b, a),), ((city, b), (city, a))
+
+        succ[a] = city
+        succ[city] = b
+        edgeLen[a] = r[a]
+        edgeLen[city] = r[b]
+        nodes[m] = city
+        pos[city] = m
+        m += 1
+
+        minDist = np.minimum(minDist, r)
+
+        if rule == "cheapest":
+            t = nodes[:m]
+            # the edge (a, b) is gone, look at all edges again for the cities which wanted it
+            stale = np.flatnonzero(outside & (bestEdge == a))
+            for start in range(0, len(stale), 1024):
+                x = stale[start:start + 1024]
+                dx = d[np.ix_(x, t)]
+                c = dx + dx[:, pos[succ[t]]] - edgeLen[t]
+                k = np.argmin(c, axis=1)
+                cost[x] = c[np.arange(len(x)), k]
+                bestEdge[x] = t[k]
+            # the new edges (a, city) and (city, b)
+            for u, v, ru in ((a, city, d.row(a)), (city, b, r)):
+                rv = r if v == city else d.row(v)
+                c = ru + rv - edgeLen[u]
+                better = outside & (c < cost)
+                cost[better] = c[better]
+                bestEdge[better] = u
+
+
+def farInGenerator(cities, ways, d):
+    return insertionGenerator(cities, ways, d, "farthest")
 
-    best = -1
-    while candidates:
-        # find farthest node
-        for i in candidates:
-            d = min(dist(cities[i], cities[j]) for j in tour)
-            if d > best or best < 0:
-                best = d
-                city = i
-        candidates.remove(city)
-        best = -1
 
-        if len(tour) == 1:
-            tour.append(city)
-            yield (), ((tour[0], city), (tour[0], city))
-            continue
+def nearInGenerator(cities, ways, d):
+    return insertionGenerator(cities, ways, d, "nearest")
 
-        for i in range(len(tour)):
-            n = (i + 1) % len(tour)
 
-            d = dist(cities[city], cities[tour[i]]) \
-                + dist(cities[city], cities[tour[n]]) \
-                - dist(cities[tour[i]], cities[tour[n]])
+def cheapInGenerator(cities, ways, d):
+    return insertionGenerator(cities, ways, d, "cheapest")
 
-            if d < best or best < 0:
-                best = d
-                minIdx = n
 
-        yield ((tour[minIdx], tour[minIdx - 1]),), ((city, tour[minIdx]), (city, tour[minIdx - 1]))
-        tour.insert(minIdx, city)
-        best = -1
+def randInGenerator(cities, ways, d):
+    return insertionGenerator(cities, ways, d, "random")
 
 
-def randomGenerator(cities, ways):
+def randomGenerator(cities, ways, d):
     tour = list(range(len(cities)))
     shuffle(tour)
     for i in range(1, len(tour)):
@@ -118,15 +234,22 @@ def randomGenerator(cities, ways):
 def twoOptGenerator(t, d):
     def swap():
         n = len(t)
-        for i in range(n):
-            for j in range(i + 1, n):
-                # if sum(newEdges) < sum(oldEdges)
-                if d[t[i]][t[j]] + d[t[i + 1]][t[(j + 1) % n]] < d[t[i]][t[i + 1]] + d[t[j]][t[(j + 1) % n]]:
-                    # reverse the sequence from j to i+1
-                    ct = j - i
-                    for m in range(ct // 2):
-                        t[i + ct - m], t[i + 1 + m] = t[i + 1 + m], t[i + ct - m]
-                    return False, ((t[i], t[j]), (t[i + 1], t[(j + 1) % n])), ((t[i], t[i + 1]), (t[j], t[j + 1]))
+        ta = np.asarray(t)
+        tn = np.roll(ta, -1)
+        # e[k] is the length of the edge (t[k], t[k + 1])
+        e = d[ta, tn]
+        rn = d.row(t[0])
+        for i in range(n - 1):
+            ri, rn = rn, d.row(t[i + 1])
+            # for all j > i: if sum(newEdges) < sum(oldEdges)
+            better = np.flatnonzero(ri[ta[i + 1:]] + rn[tn[i + 1:]] < e[i] + e[i + 1:])
+            if better.size:
+                j = i + 1 + int(better[0])
+                # reverse the sequence from j to i+1
+                ct = j - i
+                for m in range(ct // 2):
+                    t[i + ct - m], t[i + 1 + m] = t[i + 1 + m], t[i + ct - m]
+                return False, ((t[i], t[j]), (t[i + 1], t[(j + 1) % n])), ((t[i], t[i + 1]), (t[j], t[(j + 1) % n]))
 
         return True, (), ()
 
@@ -137,7 +260,7 @@ def twoOptGenerator(t, d):
 
 
 def tourStaysValid(N):
-    uf = UnionFindWrapper(range(N))
+    uf = ArrayUnionFind(range(N))
     num = [0 for _ in range(N)]
 
     def f(edge):
@@ -0,0 +1,140 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import sys
+
+import numpy as np
+
+from distanceoracle import TRIANGLE_THRESHOLD, distanceOracle
+from metrics import METRICS
+
+
+def attachSegment(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    # Before 3.13 attaching registers the segment with the resource tracker,
+    # which unlinks it when the tracker ends. Processes started by
+    # multiprocessing, with any start method, share the tracker of the
+    # publishing process, where the segment is registered already, so it
+    # stays until the publisher unlinks it. An unrelated process would start
+    # a tracker of its own and must not attach.
+    if multiprocessing.parent_process() is None:
+        raise RuntimeError("only child processes of the publisher may attach")
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedInstance:
+    """Read-only arrays of an instance in shared memory
+
+    Created by `InstanceStore.publish` or `SharedInstance.attach`; the
+    (picklable) `handle` is all a worker process needs to attach.
+    """
+    def __init__(self, handle, segments):
+        self.handle = handle
+        self.name = handle["name"]
+        self.edgeWeightType = handle.get("edgeWeightType")
+        self.segments = segments
+        self.cities = None
+        self.neighbors = None
+        self.triangle = None
+        self.coords = None
+        self.weights = None
+        for field, (_, shape, dtype) in handle["arrays"].items():
+            a = np.ndarray(shape, dtype=dtype, buffer=segments[field].buf)
+            a.flags.writeable = False
+            setattr(self, field, a)
+
+    @classmethod
+    def attach(cls, handle):
+        segments = {field: attachSegment(seg) for field, (seg, _, _) in handle["arrays"].items()}
+        return cls(handle, segments)
+
+    def distances(self):
+        """Distance oracle using the shared triangle or weights, if there are any"""
+        metric = METRICS[self.edgeWeightType] if self.coords is not None else None
+        return distanceOracle(self.cities, metric=metric, coords=self.coords, weights=self.weights,
+                              tri=self.triangle)
+
+    def close(self):
+        # the arrays must not be used after the buffers are released
+        self.cities = self.neighbors = self.triangle = self.coords = self.weights = None
+        for shm in self.segments.values():
+            shm.close()
+
+
+class InstanceStore:
+    """Publishes instances once in shared memory for other processes
+
+    The publishing process owns the segments and releases them on `evict`
+    (or `close`, also at the end of a `with` block).
+    """
+    def __init__(self, candidates=10, threshold=TRIANGLE_THRESHOLD):
+        self.candidates = candidates
+        self.threshold = threshold
+        self.instances = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.instances
+
+    def __getitem__(self, name):
+        return self.instances[name]
+
+    def publish(self, name, cities, neighbors=None, triangle=None, edgeWeightType=None, coords=None, weights=None):
+        """Store the cities and their candidate neighbors and, for small instances, distances
+
+        TSPLIB instances pass their `edgeWeightType` together with either the
+        original `coords` or the `weights` of an EXPLICIT instance (see
+        tsplib.Instance). Returns the handle to attach to the instance by.
+        """
+        if name in self.instances:
+            return self.instances[name].handle
+
+        cities = np.asarray(cities, dtype=np.float64).reshape(-1, 2)
+        if neighbors is None or (triangle is None and weights is None and len(cities) <= self.threshold):
+            metric = METRICS[edgeWeightType] if coords is not None else None
+            d = distanceOracle(cities, self.threshold, metric, coords, weights)
+            if neighbors is None:
+                neighbors = d.neighborLists(self.candidates)
+            if triangle is None and weights is None and len(cities) <= self.threshold:
+                triangle = d.triangle()
+
+        arrays = {}
+        segments = {}
+        try:
+            fields = (("cities", cities), ("neighbors", neighbors), ("triangle", triangle),
+                      ("coords", coords), ("weights", weights))
+            for field, a in fields:
+                if a is None:
+                    continue
+                a = np.asarray(a)
+                # segments of size 0 are not allowed
+                shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+                segments[field] = shm
+                np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+                arrays[field] = (shm.name, a.shape, a.dtype.str)
+        except BaseException:
+            for shm in segments.values():
+                shm.close()
+                shm.unlink()
+            raise
+
+        handle = {"name": name, "edgeWeightType": edgeWeightType, "arrays": arrays}
+        self.instances[name] = SharedInstance(handle, segments)
+        return handle
+
+    def evict(self, name):
+        instance = self.instances.pop(name)
+        segments = list(instance.segments.values())
+        instance.close()
+        for shm in segments:
+            shm.unlink()
+
+    def close(self):
+        for name in list(self.instances):
+            self.evict(name)
@@ -0,0 +1,312 @@
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+# moves have to gain at least this much, such that rounding can not lead to cycles
+EPS = 1e-10
+# number of alternatives tried at the first levels of a Lin-Kernighan chain
+BREADTH = (5, 3)
+
+
+def neighborDistances(d, neighbors):
+    # in full precision like d.pairFunction(), a stored float32 triangle
+    # would make moves between tied edges look improving
+    return d.exact(np.arange(len(neighbors))[:, None], neighbors).tolist()
+
+
+def twoOptNeighborGenerator(tour, d, neighbors):
+    """2-opt restricted to candidate neighbors, with don't-look bits
+
+    Only moves adding an edge from a city to one of its candidate neighbors
+    are tried, and a city is only looked at again after one of its tour
+    edges changed. `tour` is an ArrayTour which is modified in place, every
+    applied move is yielded as (toRemove, toAdd).
+    """
+    dist = d.pairFunction()
+    nb = neighbors.tolist()
+    nbDist = neighborDistances(d, neighbors)
+
+    queue = deque(tour.order.tolist())
+    active = [True] * len(tour)
+
+    while queue:
+        a = queue.popleft()
+        active[a] = False
+
+        improved = True
+        while improved:
+            improved = False
+            for forward in (True, False):
+                b = tour.next(a) if forward else tour.prev(a)
+                dab = dist(a, b)
+                for c, dac in zip(nb[a], nbDist[a]):
+                    # the new edge (a, c) has to be shorter than the removed (a, b)
+                    if dac >= dab:
+                        break
+                    e = tour.next(c) if forward else tour.prev(c)
+                    if c == b or e == a:
+                        continue
+                    if dab + dist(c, e) - dac - dist(b, e) > EPS:
+                        if forward:
+                            tour.reverse(b, c)
+                        else:
+                            tour.reverse(c, b)
+                        for i in (a, b, c, e):
+                            if not active[i]:
+                                active[i] = True
+                                queue.append(i)
+                        yield ((a, b), (c, e)), ((a, c), (b, e))
+                        improved = True
+                        break
+                if improved:
+                    break
+
+
+def twoOptVectorGenerator(tour, d):
+    """2-opt evaluating all moves at one tour position in a single array expression
+
+    For the edge starting at position i the gains of all moves replacing it
+    together with any non-adjacent edge are computed at once and the best
+    one is applied. It stops after a full round without improvement.
+    """
+    N = len(tour)
+    if N < 4:
+        return
+
+    order = tour.order
+    # e[k] is the length of the edge from position k to k + 1
+    nxt = np.roll(order, -1)
+    e = d[order, nxt]
+    i = 0
+    unchanged = 0
+    while unchanged < N:
+        a = int(order[i])
+        b = int(nxt[i])
+        gain = e[i] + e - d[a, order] - d[b, nxt]
+        # edges sharing a city with the edge at i
+        gain[[i - 1, i, (i + 1) % N]] = -np.inf
+        j = int(np.argmax(gain))
+        if gain[j] > EPS:
+            c = int(order[j])
+            f = int(nxt[j])
+            tour.reverse(b, c)
+            nxt = np.roll(order, -1)
+            e = d[order, nxt]
+            yield ((a, b), (c, f)), ((a, c), (b, f))
+            i = int(tour.pos[a])
+            unchanged = 0
+        else:
+            i = (i + 1) % N
+            unchanged += 1
+
+
+def exchange(tour, u1, v1, u2, v2):
+    """2-opt move replacing the tour edges (u1, v1) and (u2, v2) by (u1, u2) and (v1, v2)
+
+    Both edges have to point in the same direction along the tour.
+    """
+    if tour.next(u1) == v1:
+        tour.reverse(v1, u2)
+    else:
+        tour.reverse(u2, v1)
+
+
+def moveSegment(tour, s1, s2, u, v, x):
+    """Move the segment s1 -> s2 between the adjacent cities u -> v, with x next to u"""
+    p = tour.prev(s1)
+    n = tour.next(s2)
+    if u == n:
+        exchange(tour, p, s1, n, v)
+    elif v == p:
+        exchange(tour, u, p, s2, n)
+    else:
+        exchange(tour, p, s1, u, v)
+        exchange(tour, p, u, n, s2)
+    # the segment is now inserted as u, s2, ..., s1, v
+    if x == s1:
+        exchange(tour, u, s2, s1, v)
+
+
+def orOptGenerator(tour, d, neighbors, maxLength=3):
+    """Or-opt: move segments of up to maxLength cities to a better place
+
+    Segments are only moved next to a candidate neighbor of one of their
+    ends, the gain of each move is computed from the six involved edges.
+    Uses don't-look bits like twoOptNeighborGenerator and yields every
+    applied move as (toRemove, toAdd).
+    """
+    N = len(tour)
+    dist = d.pairFunction()
+    nb = neighbors.tolist()
+    nbDist = neighborDistances(d, neighbors)
+
+    queue = deque(tour.order.tolist())
+    active = [True] * N
+
+    def search(a):
+        for L in range(1, maxLength + 1):
+            if L + 3 > N:
+                break
+            for forward in (True, False):
+                # the segment s1 -> s2 in tour direction, starting or ending at a
+                seg = [a]
+                for _ in range(L - 1):
+                    seg.append(tour.next(seg[-1]) if forward else tour.prev(seg[-1]))
+                if not forward:
+                    seg.reverse()
+                s1, s2 = seg[0], seg[-1]
+                p = tour.prev(s1)
+                n = tour.next(s2)
+                removeGain = dist(p, s1) + dist(s2, n) - dist(p, n)
+
+                for x, y in ((s1, s2), (s2, s1)):
+                    for c, dxc in zip(nb[x], nbDist[x]):
+                        if dxc >= removeGain:
+                            break
+                        if c in seg:
+                            continue
+                        # insert as c, x, ..., y, next(c) or as prev(c), y, ..., x, c
+                        for u, v in ((c, tour.next(c)), (tour.prev(c), c)):
+                            if u in seg or v in seg:
+                                continue
+                            w = v if u == c else u
+                            if removeGain - dxc - dist(y, w) + dist(u, v) > EPS:
+                                return s1, s2, p, n, u, v, x if u == c else y
+                if L == 1:
+                    break
+        return None
+
+    while queue:
+        a = queue.popleft()
+        active[a] = False
+
+        move = search(a)
+        while move:
+            s1, s2, p, n, u, v, x = move
+            y = s2 if x == s1 else s1
+            moveSegment(tour, s1, s2, u, v, x)
+
+            toRemove = {frozenset(e) for e in ((p, s1), (s2, n), (u, v))}
+            toAdd = {frozenset(e) for e in ((p, n), (u, x), (y, v))}
+            for i in (s1, s2, p, n, u, v):
+                if not active[i]:
+                    active[i] = True
+                    queue.append(i)
+            yield tuple(tuple(e) for e in toRemove - toAdd), tuple(tuple(e) for e in toAdd - toRemove)
+            move = search(a)
+
+
+def linKernighanGenerator(tour, d, neighbors, maxDepth=10, timeLimit=None):
+    """Lin-Kernighan style variable-depth search built from sequential 2-opt moves
+
+    Starting from a removed edge (t1, t2), the chain repeatedly adds an edge
+    from t2 to a candidate neighbor t3 and removes the edge (t3, t4) which
+    keeps the tour closed by (t4, t1), up to maxDepth levels. The tour is
+    rolled back to the best closed tour found along the chain, which is
+    yielded as (toRemove, toAdd) if it is shorter. Edges added by a chain are
+    not removed again within it. Stops after `timeLimit` seconds, if given,
+    counting only the time spent in the generator, not between the moves.
+    """
+    N = len(tour)
+    if N < 5:
+        return
+    dist = d.pairFunction()
+    nb = neighbors.tolist()
+    nbDist = neighborDistances(d, neighbors)
+    # time used by the generator before it was last resumed
+    used = 0.
+    resumed = perf_counter()
+
+    queue = deque(tour.order.tolist())
+    active = [True] * N
+
+    def move(t1, t2, t3):
+        """2-opt move removing (t1, t2) and the edge (t3, t4) such that (t2, t3) and (t4, t1) close the tour"""
+        if tour.next(t1) == t2:
+            t4 = tour.prev(t3)
+            tour.reverse(t2, t4)
+        else:
+            t4 = tour.next(t3)
+            tour.reverse(t4, t2)
+        return t4
+
+    def undo(t1, t2, t4):
+        if tour.next(t1) == t4:
+            tour.reverse(t4, t2)
+        else:
+            tour.reverse(t2, t4)
+
+    def chain(t1, t2):
+        """Best improving chain starting by removing (t1, t2), applied to the tour"""
+        added = set()
+        moves = []
+        best = [EPS, 0]
+
+        def search(t2, g):
+            depth = len(moves)
+            if depth == maxDepth:
+                return
+            forward = tour.next(t1) == t2
+            candidates = []
+            for t3, d23 in zip(nb[t2], nbDist[t2]):
+                if g - d23 <= EPS:
+                    break
+                if t3 == t1:
+                    continue
+                t4 = tour.prev(t3) if forward else tour.next(t3)
+                if t4 == t2 or frozenset((t3, t4)) in added:
+                    continue
+                candidates.append((dist(t3, t4) - d23, t3, t4))
+            candidates.sort(reverse=True)
+
+            for score, t3, t4 in candidates[:BREADTH[depth] if depth < len(BREADTH) else 1]:
+                move(t1, t2, t3)
+                e = frozenset((t2, t3))
+                added.add(e)
+                moves.append((t2, t3, t4))
+                closed = g + score - dist(t4, t1)
+                if closed > best[0]:
+                    best[:] = closed, len(moves)
+                search(t4, g + score)
+                if best[1]:
+                    return
+                moves.pop()
+                added.discard(e)
+                undo(t1, t2, t4)
+
+        search(t2, dist(t1, t2))
+        for t2, _, t4 in reversed(moves[best[1]:]):
+            undo(t1, t2, t4)
+        return moves[:best[1]]
+
+    while queue:
+        if timeLimit is not None and used + perf_counter() - resumed > timeLimit:
+            break
+        a = queue.popleft()
+        active[a] = False
+
+        for b in (tour.next(a), tour.prev(a)):
+            moves = chain(a, b)
+            if not moves:
+                continue
+
+            # net change of the edges, intermediate closing edges cancel
+            change = {}
+            t2 = b
+            for _, t3, t4 in moves:
+                for e, c in (((a, t2), -1), ((t3, t4), -1), ((t2, t3), 1), ((t4, a), 1)):
+                    e = frozenset(e)
+                    change[e] = change.get(e, 0) + c
+                t2 = t4
+            toRemove = tuple(tuple(e) for e, c in change.items() if c < 0)
+            toAdd = tuple(tuple(e) for e, c in change.items() if c > 0)
+            for e in toRemove + toAdd:
+                for i in e:
+                    if not active[i]:
+                        active[i] = True
+                        queue.append(i)
+            used += perf_counter() - resumed
+            yield toRemove, toAdd
+            resumed = perf_counter()
+            break
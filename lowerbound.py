@@ -0,0 +1,242 @@
+"""Held-Karp lower bounds of the tour length by 1-trees
+
+A 1-tree is a spanning tree plus one more edge at a leaf. With potentials
+`pi` on the cities, i.e., costs d[i, j] + pi[i] + pi[j], the length of the
+minimum 1-tree minus 2 sum(pi) is a lower bound of every tour. Subgradient
+optimization raises the potentials of cities of degree larger than 2 and
+lowers the ones of leaves, until the bound converges to the Held-Karp bound,
+which is typically within a percent of the optimum.
+
+Up to EXACT_THRESHOLD cities the trees span the complete graph. Larger
+instances only use the candidate edges, as LKH does. Their bounds are
+estimates, which are exact as long as the minimum trees consist of candidate
+edges, which is usually the case for geometric instances. Otherwise they may
+even exceed the optimum.
+"""
+
+from math import inf
+
+import numpy as np
+
+# up to this many cities the trees use all edges
+EXACT_THRESHOLD = 1000
+# the step size is halved after this many iterations without improvement
+PATIENCE = 10
+# the optimization ends when the step size factor is below this
+MIN_STEP = 1e-3
+
+
+def spanningForest(N, u, v, order):
+    """Minimum spanning forest of the edges (u, v), `order` sorts them by weight
+
+    Returns the indices of its edges and the component of every city.
+    Borůvka's algorithm, vectorized: in every round every component chooses
+    its cheapest outgoing edge and the components are merged along them.
+    Ties are resolved by the position in `order`, such that the choices never
+    form cycles.
+    """
+    comp = np.arange(N)
+    edges = np.asarray(order, dtype=np.intp)
+    forest = [np.empty(0, dtype=np.intp)]
+    while len(edges):
+        cu = comp[u[edges]]
+        cv = comp[v[edges]]
+        outer = cu != cv
+        edges, cu, cv = edges[outer], cu[outer], cv[outer]
+        if not len(edges):
+            break
+
+        # cheapest edge of every component, edges stay sorted by weight
+        rank = np.arange(len(edges))
+        first = np.full(N, len(edges))
+        np.minimum.at(first, cu, rank)
+        np.minimum.at(first, cv, rank)
+        c = np.flatnonzero(first < len(edges))
+        best = edges[first[c]]
+        forest.append(np.unique(best))
+
+        # every component points to the one its edge leads to, of two
+        # components choosing the same edge the smaller one becomes the root
+        other = comp[u[best]] + comp[v[best]] - c
+        parent = np.arange(N)
+        parent[c] = other
+        mutual = (parent[other] == c) & (c < other)
+        parent[c[mutual]] = c[mutual]
+        while True:
+            p = parent[parent]
+            if np.array_equal(p, parent):
+                break
+            parent = p
+        comp = parent[comp]
+
+    return np.concatenate(forest), comp
+
+
+def stripTour(cities):
+    """Tour through vertical strips of about sqrt(2 N) cities, up and down in turns"""
+    x, y = cities[:, 0], cities[:, 1]
+    strips = max(1, int(np.sqrt(len(cities) / 2)))
+    s = np.minimum((x - x.min()) / (np.ptp(x) or 1.) * strips, strips - 1).astype(np.intp)
+    return np.lexsort((np.where(s % 2, -y, y), s))
+
+
+class HeldKarp:
+    """Lower bounds of the tours through the cities of a distance oracle
+
+    `neighbors` are the candidate neighbor lists, which are only needed for
+    more than `exactThreshold` cities. `upper`, the length of a tour, sets
+    the step sizes; it may be updated while `bounds` runs.
+    """
+    def __init__(self, distances, neighbors=None, upper=None, exactThreshold=EXACT_THRESHOLD):
+        self.d = distances
+        self.N = len(distances)
+        self.upper = upper
+        self.exact = self.N <= exactThreshold
+        if not self.exact:
+            if neighbors is None:
+                raise ValueError("the bounds of large instances need candidate neighbors")
+            self.u, self.v = self.candidateEdges(neighbors)
+            self.cost = np.asarray(self.d[self.u, self.v], dtype=np.float64)
+
+    def candidateEdges(self, neighbors):
+        """Edges (u, v) with u < v to the candidate neighbors and of a strip tour
+
+        The edges of a tour keep the bounds finite, which is not the case if
+        the candidate edges do not contain one, e.g., for clustered cities.
+        Every component of the candidate graph also gets the edge to the
+        nearest city outside of it.
+        """
+        N = self.N
+        neighbors = np.asarray(neighbors, dtype=np.intp)
+        i = np.repeat(np.arange(N), neighbors.shape[1])
+        j = neighbors.ravel()
+        key = np.unique(np.minimum(i, j) * N + np.maximum(i, j))
+
+        u, v = np.divmod(key, N)
+        _, comp = spanningForest(N, u, v, np.arange(len(u)))
+        roots = np.unique(comp)
+        bridges = []
+        if len(roots) > 1:
+            for a in roots.tolist():
+                r = np.array(self.d.row(a))
+                r[comp == comp[a]] = inf
+                b = int(np.argmin(r))
+                bridges.append(min(a, b) * N + max(a, b))
+
+        tour = stripTour(self.d.cities)
+        nextCity = np.roll(tour, -1)
+        tourKey = np.minimum(tour, nextCity) * N + np.maximum(tour, nextCity)
+        key = np.unique(np.concatenate((key, np.array(bridges, dtype=np.intp), tourKey)))
+        return np.divmod(key, N)
+
+    def oneTree(self, pi):
+        """Length of the minimum 1-tree with potentials pi and the degrees of the cities in it"""
+        if self.exact:
+            tree, two, cost = self.denseTree(pi)
+        else:
+            tree, two, cost = self.sparseTree(pi)
+        a, b = tree
+        degree = np.bincount(a, minlength=self.N) + np.bincount(b, minlength=self.N)
+
+        # the added edge is the cheapest one of a leaf that is not in the
+        # tree, the leaf where it is the most expensive gives the best bound
+        leaves = np.flatnonzero(degree == 1)
+        neighbor = np.empty(self.N, dtype=np.intp)
+        neighbor[a] = b
+        neighbor[b] = a
+        inTree = two[leaves, 0] == neighbor[leaves]
+        partner = np.where(inTree, two[leaves, 1], two[leaves, 0])
+        weight = self.weights(leaves, partner, pi)
+        k = int(np.argmax(weight))
+        degree[leaves[k]] += 1
+        degree[partner[k]] += 1
+
+        return cost + weight[k] - 2 * pi.sum(), degree
+
+    def weights(self, i, j, pi):
+        return np.asarray(self.d[i, j], dtype=np.float64) + pi[i] + pi[j]
+
+    def denseTree(self, pi):
+        """Prim's algorithm on the complete graph
+
+        Returns the edges of the tree, the two nearest neighbors of every
+        city and the length of the tree.
+        """
+        N = self.N
+        key = np.full(N, inf)
+        parent = np.zeros(N, dtype=np.intp)
+        free = np.ones(N, dtype=bool)
+        two = np.empty((N, 2), dtype=np.intp)
+        order = np.empty(N, dtype=np.intp)
+        cost = 0.
+        v = 0
+        for n in range(N):
+            order[n] = v
+            cost += key[v] if n else 0.
+            free[v] = False
+            key[v] = inf
+
+            r = np.array(self.d.row(v)) + pi + pi[v]
+            r[v] = inf
+            nearest = np.argpartition(r, 1)[:2]
+            two[v] = nearest[np.argsort(r[nearest], kind="stable")]
+
+            better = r < key
+            better &= free
+            key[better] = r[better]
+            parent[better] = v
+            v = int(np.argmin(key))
+        children = order[1:]
+        return (parent[children], children), two, cost
+
+    def sparseTree(self, pi):
+        """Borůvka's algorithm on the candidate edges
+
+        Returns the edges of the tree, the two nearest candidate neighbors
+        of every city and the length of the tree.
+        """
+        u, v = self.u, self.v
+        w = self.cost + pi[u] + pi[v]
+        order = np.argsort(w, kind="stable")
+        forest, _ = spanningForest(self.N, u, v, order)
+
+        # both ends of the edges by increasing weight, grouped by city
+        ends = np.stack((u[order], v[order]), axis=1).ravel()
+        others = np.stack((v[order], u[order]), axis=1).ravel()
+        byCity = np.argsort(ends, kind="stable")
+        counts = np.bincount(ends, minlength=self.N)
+        first = np.cumsum(counts) - counts
+        two = np.stack((others[byCity[first]], others[byCity[first + 1]]), axis=1)
+        return (u[forest], v[forest]), two, w[forest].sum()
+
+    def bounds(self):
+        """Generator of the best bound after every iteration of the subgradient optimization
+
+        Ends when the step size vanishes or the 1-tree is a tour, i.e., the
+        bound is the optimum.
+        """
+        if self.N < 3:
+            return
+        pi = np.zeros(self.N)
+        best = -inf
+        step = 2.
+        stale = 0
+        while step > MIN_STEP:
+            bound, degree = self.oneTree(pi)
+            if bound > best:
+                best = bound
+                stale = 0
+            else:
+                stale += 1
+                if stale >= PATIENCE:
+                    step /= 2
+                    stale = 0
+            yield best
+
+            g = degree - 2
+            norm = float(g @ g)
+            if not norm:
+                return
+            # without a tour, aim a little above the current bound
+            upper = self.upper if self.upper is not None and self.upper > best else 1.05 * best
+            pi = pi + step * (upper - bound) / norm * g
@@ -7,7 +7,7 @@ ILOSTLBEGIN
 // Achtung! hier ist C mit Klassen C++ code :/
 
 // Konstruktor
-CplexTSPSolver::CplexTSPSolver(int n, py::list d)
+CplexTSPSolver::CplexTSPSolver(int n, py::object d)
     : mip(0), mtz(0), cuts(1), v(0), seed(42), genericCuts(false), max_time(0), onlyLP(false), heuristic(false)
 {
     first = true;
@@ -289,7 +289,7 @@ py::list CplexTSPSolver::nextRelaxation()
 
 BOOST_PYTHON_MODULE(CplexTSPSolver)
 {
-    py::class_<CplexTSPSolver>("CplexTSPSolver", py::init<int, py::list>())
+    py::class_<CplexTSPSolver>("CplexTSPSolver", py::init<int, py::object>())
         .def("nextRelaxation", &CplexTSPSolver::nextRelaxation)
     ;
 }
@@ -15,7 +15,7 @@ typedef std::deque<int> tour_t;
 class CplexTSPSolver
 {
     public:
-        CplexTSPSolver(int N, py::list d);
+        CplexTSPSolver(int N, py::object d);
         ~CplexTSPSolver();
 
         double solve(double &relaxObj, int &searchedNodes, int& numCuts, int &relaxCuts);
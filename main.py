@@ -29,6 +29,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.setWindowIcon(QtGui.QIcon(os.path.join("img/icon.ico")))
 
         self.ui.comboMethod.activated.connect(self.changeMethod)
+        self.ui.comboTwoOpt.activated.connect(self.changeTwoOptMethod)
         self.ui.comboTSPLIB.activated.connect(self.initTSPLIB)
 
         self.ui.actionCities.triggered.connect(self.ui.view.changeColorCities)
@@ -37,6 +38,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.ui.actionSaveTSPLIB.triggered.connect(self.saveConfig)
         self.ui.actionSaveSVG.triggered.connect(self.savePicture)
         self.ui.actionLoad.triggered.connect(self.loadConfig)
+        self.ui.actionSaveTour.triggered.connect(self.saveTour)
+        self.ui.actionLoadTour.triggered.connect(self.loadTour)
+        self.ui.actionSaveSolution.triggered.connect(self.saveSolution)
+        self.ui.actionLoadSolution.triggered.connect(self.loadSolution)
 
         self.ui.pushButtonStep.clicked.connect(self.ui.view.step)
         self.ui.pushButtonRun.toggled.connect(self.ui.view.run)
@@ -51,17 +56,27 @@ class MainWindow(QtWidgets.QMainWindow):
 
         self.ui.spinBoxN.valueChanged.connect(self.ui.view.setN)
         self.ui.spinBoxDelay.valueChanged.connect(self.ui.view.setTimestep)
+        self.ui.spinBoxMoves.valueChanged.connect(self.ui.view.setMovesPerFrame)
         self.ui.spinBoxSigma.valueChanged.connect(self.ui.view.setSigma)
 
         self.ui.checkBox2Opt.toggled.connect(self.ui.view.setDo2Opt)
+        self.ui.checkBoxOrOpt.toggled.connect(self.ui.view.setDoOrOpt)
+        self.ui.checkBoxLinKernighan.toggled.connect(self.ui.view.setDoLinKernighan)
         self.ui.checkBoxConcorde.toggled.connect(self.ui.view.setDoConcorde)
         self.ui.checkBoxEdgeweight.toggled.connect(self.ui.view.setShowValues)
 
         self.ui.view.lenChanged.connect(self.ui.labelLen.setText)
         self.ui.view.twoOptChanged.connect(self.ui.label2Opt.setText)
+        self.ui.view.orOptChanged.connect(self.ui.labelOrOpt.setText)
+        self.ui.view.linKernighanChanged.connect(self.ui.labelLinKernighan.setText)
         self.ui.view.optimumChanged.connect(self.ui.labelOpt.setText)
         self.ui.view.gapChanged.connect(self.ui.labelGap.setText)
+        self.ui.view.lowerBoundChanged.connect(self.ui.labelBound.setText)
+        self.ui.view.boundGapChanged.connect(self.ui.labelBoundGap.setText)
         self.ui.view.twoOptAvailable.connect(self.ui.checkBox2Opt.setEnabled)
+        self.ui.view.twoOptAvailable.connect(self.ui.comboTwoOpt.setEnabled)
+        self.ui.view.twoOptAvailable.connect(self.ui.checkBoxOrOpt.setEnabled)
+        self.ui.view.twoOptAvailable.connect(self.ui.checkBoxLinKernighan.setEnabled)
         self.ui.view.twoOptAvailable.connect(lambda x: self.ui.checkBoxEdgeweight.setEnabled(not x))
         self.ui.view.TSPLIBChange.connect(lambda x: self.ui.comboTSPLIB.setCurrentIndex(self.TSPLIBinstances[x]))
         self.ui.view.TSPLIBChange.connect(lambda x: self.ui.spinBoxN.setValue(int(re.sub("[^0-9]", "", x))))
@@ -71,9 +86,17 @@ class MainWindow(QtWidgets.QMainWindow):
         if os.path.exists("concorde"):
             self.ui.checkBoxConcorde.setEnabled(True)
 
+    def closeEvent(self, e):
+        self.ui.view.stopLowerBound(wait=True)
+        self.ui.view.stopSolver()
+        super().closeEvent(e)
+
     def changeMethod(self):
         self.ui.view.changeMethod(str(self.ui.comboMethod.currentText()))
 
+    def changeTwoOptMethod(self):
+        self.ui.view.setTwoOptMethod(str(self.ui.comboTwoOpt.currentText()))
+
     def getTSPLIB(self):
         try:
             from urllib import request
@@ -93,35 +116,17 @@ class MainWindow(QtWidgets.QMainWindow):
             os.makedirs("TSPLIB", exist_ok=True)
 
     def populateTSPLIB(self):
-        import gzip
+        from tsplib import TSPLIBIndex
 
-        doable = []
         if not os.path.exists("TSPLIB"):
             self.getTSPLIB()
 
-        for name in os.listdir("TSPLIB"):
-            euclidean = False
-            nodecoords = False
-            displayable = False
-            # do only take instances smaller than 500
-            if ".tsp.gz" in name and int(re.sub("[^0-9]", "", name)) < 500:
-                with gzip.open(os.path.join("TSPLIB", name), "rt") as f:
-                    for i in f.readlines():
-                        if "EUC_2D" in i:
-                            euclidean = True
-                        if "NODE_COORD_SECTION" in i:
-                            nodecoords = True
-                            break
-                        if "DISPLAY_DATA_SECTION" in i:
-                            displayable = True
-                            break
-                if euclidean and nodecoords or displayable:  # make all displayable available, though their solutions will deviate
-                    doable.append(name)
+        # make all displayable available, though their solutions will deviate
+        doable = TSPLIBIndex("TSPLIB").doable()
 
         if doable:
             self.ui.comboTSPLIB.setEnabled(True)
 
-        doable.sort(key=lambda x: int(re.sub("[^0-9]", "", x)))
         for i in doable:
             i = i.replace(".tsp.gz", "")
             self.ui.comboTSPLIB.addItem(i)
@@ -136,7 +141,7 @@ class MainWindow(QtWidgets.QMainWindow):
         try:
             from lp.CplexTSPSolver import CplexTSPSolver
         except ImportError:
-            self.ui.comboMethod.removeItem(4)
+            self.ui.comboMethod.removeItem(self.ui.comboMethod.findText("LP & Cutting Planes"))
 
     def loadConfig(self):
         name = QtWidgets.QFileDialog.getOpenFileName()[0]
@@ -146,6 +151,35 @@ class MainWindow(QtWidgets.QMainWindow):
         name = QtWidgets.QFileDialog.getSaveFileName()[0]
         self.ui.view.saveTSPLIB(name)
 
+    def saveTour(self):
+        name = QtWidgets.QFileDialog.getSaveFileName(filter="TSPLIB tours (*.tour)")[0]
+        if name:
+            try:
+                self.ui.view.saveTour(name)
+            except ValueError as e:
+                self.statusBar().showMessage(str(e), 5000)
+
+    def loadTour(self):
+        name = QtWidgets.QFileDialog.getOpenFileName(filter="TSPLIB tours (*.tour)")[0]
+        if name:
+            try:
+                self.ui.view.loadTour(name)
+            except ValueError as e:
+                self.statusBar().showMessage(str(e), 5000)
+
+    def saveSolution(self):
+        name = QtWidgets.QFileDialog.getSaveFileName(filter="Solutions (*.npz)")[0]
+        if name:
+            try:
+                self.ui.view.saveSolution(name)
+            except ValueError as e:
+                self.statusBar().showMessage(str(e), 5000)
+
+    def loadSolution(self):
+        name = QtWidgets.QFileDialog.getOpenFileName(filter="Solutions (*.npz)")[0]
+        if name:
+            self.ui.view.loadSolution(name)
+
     def savePicture(self):
         name = QtWidgets.QFileDialog.getSaveFileName()[0]
         self.ui.view.saveSVG(name)
@@ -0,0 +1,108 @@
+"""Distance functions of the TSPLIB edge weight types
+
+Every metric has a vectorized version working on arrays of points of shape
+(..., 2) and a plain version for single pairs (x1, y1, x2, y2), which is
+faster in loops. `prepare` converts the coordinates of the file into the
+points the metric works on.
+"""
+
+from math import acos, ceil, cos, sqrt
+
+import numpy as np
+
+# constants as defined by TSPLIB
+PI = 3.141592
+RRR = 6378.388
+
+
+class Metric:
+    def __init__(self, vector, scalar, prepare=None, euclidean=False):
+        self.vector = vector
+        self.scalar = scalar
+        self.prepare = prepare or (lambda coords: np.asarray(coords, dtype=np.float64))
+        # distances grow with the euclidean distance of the points, so that
+        # spatial indices find the nearest cities
+        self.euclidean = euclidean
+
+
+def nint(x):
+    return np.floor(x + 0.5)
+
+
+def euc2d(a, b):
+    return nint(np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1]))
+
+
+def euc2dScalar(x1, y1, x2, y2):
+    return float(int(sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2) + 0.5))
+
+
+def ceil2d(a, b):
+    return np.ceil(np.hypot(a[..., 0] - b[..., 0], a[..., 1] - b[..., 1]))
+
+
+def ceil2dScalar(x1, y1, x2, y2):
+    return float(ceil(sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)))
+
+
+def att(a, b):
+    dx = a[..., 0] - b[..., 0]
+    dy = a[..., 1] - b[..., 1]
+    r = np.sqrt((dx * dx + dy * dy) / 10.)
+    t = nint(r)
+    return t + (t < r)
+
+
+def attScalar(x1, y1, x2, y2):
+    r = sqrt(((x1 - x2) ** 2 + (y1 - y2) ** 2) / 10.)
+    t = int(r + 0.5)
+    return float(t + 1 if t < r else t)
+
+
+def geoPrepare(coords):
+    """Latitude and longitude in radians from the DDD.MM format"""
+    c = np.asarray(coords, dtype=np.float64)
+    deg = np.trunc(c)
+    return PI * (deg + 5. * (c - deg) / 3.) / 180.
+
+
+def geo(a, b):
+    q1 = np.cos(a[..., 1] - b[..., 1])
+    q2 = np.cos(a[..., 0] - b[..., 0])
+    q3 = np.cos(a[..., 0] + b[..., 0])
+    x = np.clip(0.5 * ((1. + q1) * q2 - (1. - q1) * q3), -1., 1.)
+    return np.floor(RRR * np.arccos(x) + 1.)
+
+
+def geoScalar(x1, y1, x2, y2):
+    q1 = cos(y1 - y2)
+    q2 = cos(x1 - x2)
+    q3 = cos(x1 + x2)
+    x = min(1., max(-1., 0.5 * ((1. + q1) * q2 - (1. - q1) * q3)))
+    return float(int(RRR * acos(x) + 1.))
+
+
+def man2d(a, b):
+    return nint(np.abs(a[..., 0] - b[..., 0]) + np.abs(a[..., 1] - b[..., 1]))
+
+
+def man2dScalar(x1, y1, x2, y2):
+    return float(int(abs(x1 - x2) + abs(y1 - y2) + 0.5))
+
+
+def max2d(a, b):
+    return np.maximum(nint(np.abs(a[..., 0] - b[..., 0])), nint(np.abs(a[..., 1] - b[..., 1])))
+
+
+def max2dScalar(x1, y1, x2, y2):
+    return float(max(int(abs(x1 - x2) + 0.5), int(abs(y1 - y2) + 0.5)))
+
+
+METRICS = {
+    "EUC_2D": Metric(euc2d, euc2dScalar, euclidean=True),
+    "CEIL_2D": Metric(ceil2d, ceil2dScalar, euclidean=True),
+    "ATT": Metric(att, attScalar, euclidean=True),
+    "GEO": Metric(geo, geoScalar, prepare=geoPrepare),
+    "MAN_2D": Metric(man2d, man2dScalar),
+    "MAX_2D": Metric(max2d, max2dScalar),
+}
@@ -0,0 +1,95 @@
+import queue
+
+from PyQt5 import QtCore
+
+from configuration import Configuration
+
+# number of moves waiting to be drawn, before the solver waits for the view
+MAX_MOVES = 10000
+
+
+class SolverThread(QtCore.QThread):
+    """Runs a configuration to completion in the background
+
+    Every step is done while holding `lock`, the moves applied by it are put
+    into the bounded queue `moves`, from which the view takes them without
+    the lock. A move is `(toRemove, toAdd)` or None if the whole tour
+    changed. The local searches run in their fast paths, i.e., as one step,
+    which reports its progress as `(elapsed, length, moves)` and hands over
+    its moves with every report. Interruptions stop it between two moves.
+    """
+    def __init__(self, conf, lock, maxMoves=MAX_MOVES, parent=None):
+        super().__init__(parent)
+        self.conf = conf
+        self.lock = lock
+        self.moves = queue.Queue(maxMoves)
+        self.progress = None
+
+    def run(self):
+        conf = self.conf
+        while not self.isInterruptionRequested():
+            # the moves are queued before the lock is released, such that the
+            # view sees a state whose moves are all in the queue
+            with self.lock:
+                if conf.lp or not conf.finishedFirst:
+                    done = Configuration.step(conf)
+                else:
+                    conf.solve(callback=self.report, interval=0.1, stop=self.isInterruptionRequested)
+                    done = True
+                self.queueMoves(conf.takeStepMoves())
+
+            if done or conf.finished():
+                break
+
+    def queueMoves(self, moves):
+        """Put moves into the queue, waits while it is full"""
+        # too many moves are cheaper to draw as a new tour
+        if len(moves) > self.moves.maxsize:
+            moves = [None]
+        for m in moves:
+            while not self.isInterruptionRequested():
+                try:
+                    self.moves.put(m, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def report(self, elapsed, length, moves):
+        self.progress = elapsed, length, moves
+        # the lock is held by the running step
+        self.queueMoves(self.conf.takeStepMoves())
+
+    def takeMoves(self):
+        """All moves in the queue, without waiting"""
+        moves = []
+        try:
+            while True:
+                moves.append(self.moves.get_nowait())
+        except queue.Empty:
+            return moves
+
+
+class LowerBoundThread(QtCore.QThread):
+    """Builds a HeldKarp engine by `factory` and runs its subgradient optimization in the background
+
+    Emits `improved` with every better bound. `upper`, the length of the
+    best known tour, may be updated while it runs.
+    """
+    improved = QtCore.pyqtSignal(float)
+
+    def __init__(self, factory, parent=None):
+        super().__init__(parent)
+        self.factory = factory
+        self.upper = None
+
+    def run(self):
+        heldKarp = self.factory()
+        best = None
+        for bound in heldKarp.bounds():
+            if self.isInterruptionRequested():
+                break
+            if self.upper is not None:
+                heldKarp.upper = self.upper
+            if best is None or bound > best:
+                best = bound
+                self.improved.emit(bound)
@@ -0,0 +1,187 @@
+from math import inf
+import heapq
+
+import numpy as np
+
+
+class KDTree:
+    """k-d tree over 2d points which supports the removal of points
+
+    Every node knows the bounding box of its points and how many of them
+    are still present, such that emptied subtrees are skipped by queries.
+    """
+    def __init__(self, points, leafSize=8):
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.x = p[:, 0].tolist()
+        self.y = p[:, 1].tolist()
+        self.present = [True] * len(p)
+        self.count = len(p)
+        self.leafOf = [-1] * len(p)
+
+        # one entry per node
+        self.left = []
+        self.right = []
+        self.parent = []
+        self.alive = []
+        self.box = []
+        self.splitDim = []
+        self.splitVal = []
+        self.points = []
+
+        if len(p):
+            self.build(p, leafSize)
+
+    def build(self, p, leafSize):
+        perm = np.arange(len(p))
+        stack = [(0, len(p), -1, False)]
+        while stack:
+            lo, hi, parent, isRight = stack.pop()
+            node = len(self.left)
+            if parent >= 0:
+                if isRight:
+                    self.right[parent] = node
+                else:
+                    self.left[parent] = node
+
+            idx = perm[lo:hi]
+            q = p[idx]
+            x0, y0 = q.min(axis=0)
+            x1, y1 = q.max(axis=0)
+            self.parent.append(parent)
+            self.alive.append(hi - lo)
+            self.box.append((x0, y0, x1, y1))
+            self.left.append(-1)
+            self.right.append(-1)
+
+            if hi - lo <= leafSize:
+                self.splitDim.append(-1)
+                self.splitVal.append(0.)
+                self.points.append(idx.tolist())
+                for i in self.points[-1]:
+                    self.leafOf[i] = node
+                continue
+
+            # split at the median of the longer side of the bounding box
+            dim = 0 if x1 - x0 >= y1 - y0 else 1
+            mid = (hi - lo) // 2
+            perm[lo:hi] = idx[np.argpartition(q[:, dim], mid)]
+            self.splitDim.append(dim)
+            self.splitVal.append(p[perm[lo + mid], dim])
+            self.points.append(())
+            stack.append((lo + mid, hi, node, True))
+            stack.append((lo, lo + mid, node, False))
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, i):
+        return self.present[i]
+
+    def remove(self, i):
+        if not self.present[i]:
+            return
+        self.present[i] = False
+        self.count -= 1
+        node = self.leafOf[i]
+        while node >= 0:
+            self.alive[node] -= 1
+            node = self.parent[node]
+
+    def nearest(self, x, y):
+        """Index of the present point closest to (x, y), smallest index on ties
+
+        Returns None if no point is left.
+        """
+        if not self.count:
+            return None
+
+        px, py, present = self.x, self.y, self.present
+        alive, box, left, right = self.alive, self.box, self.left, self.right
+        bestD = inf
+        best = -1
+        stack = [0]
+        while stack:
+            n = stack.pop()
+            if not alive[n]:
+                continue
+            x0, y0, x1, y1 = box[n]
+            dx = x0 - x if x < x0 else (x - x1 if x > x1 else 0.)
+            dy = y0 - y if y < y0 else (y - y1 if y > y1 else 0.)
+            if dx * dx + dy * dy > bestD:
+                continue
+
+            if left[n] < 0:
+                for i in self.points[n]:
+                    if present[i]:
+                        dx = px[i] - x
+                        dy = py[i] - y
+                        dd = dx * dx + dy * dy
+                        if dd < bestD or (dd == bestD and i < best):
+                            bestD = dd
+                            best = i
+            elif (x if self.splitDim[n] == 0 else y) < self.splitVal[n]:
+                # the nearer child is visited first, i.e., pushed last
+                stack.append(right[n])
+                stack.append(left[n])
+            else:
+                stack.append(left[n])
+                stack.append(right[n])
+
+        return best
+
+    def nearestK(self, x, y, k):
+        """Indices of the (up to) k present points closest to (x, y), nearest first"""
+        if k <= 0:
+            return []
+        px, py, present = self.x, self.y, self.present
+        alive, box, left, right = self.alive, self.box, self.left, self.right
+        # max-heap of the best candidates so far as (-distance, -index)
+        heap = []
+        bound = inf
+        stack = [0] if self.count else []
+        while stack:
+            n = stack.pop()
+            if not alive[n]:
+                continue
+            x0, y0, x1, y1 = box[n]
+            dx = x0 - x if x < x0 else (x - x1 if x > x1 else 0.)
+            dy = y0 - y if y < y0 else (y - y1 if y > y1 else 0.)
+            if dx * dx + dy * dy > bound:
+                continue
+
+            if left[n] < 0:
+                for i in self.points[n]:
+                    if present[i]:
+                        dx = px[i] - x
+                        dy = py[i] - y
+                        dd = dx * dx + dy * dy
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-dd, -i))
+                        elif (dd, i) < (-heap[0][0], -heap[0][1]):
+                            heapq.heapreplace(heap, (-dd, -i))
+                        else:
+                            continue
+                        if len(heap) == k:
+                            bound = -heap[0][0]
+            elif (x if self.splitDim[n] == 0 else y) < self.splitVal[n]:
+                stack.append(right[n])
+                stack.append(left[n])
+            else:
+                stack.append(left[n])
+                stack.append(right[n])
+
+        return [-i for _, i in sorted(heap, reverse=True)]
+
+
+def neighborLists(points, k):
+    """(N, k) array of the k nearest other points of every point, nearest first
+
+    If there are not more than k points, all other points are listed.
+    """
+    p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    k = max(0, min(k, len(p) - 1))
+    tree = KDTree(p)
+    out = np.empty((len(p), k), dtype=np.intp)
+    for i, (x, y) in enumerate(p.tolist()):
+        out[i] = [j for j in tree.nearestK(x, y, k + 1) if j != i][:k]
+    return out
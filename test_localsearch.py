@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from distanceoracle import distanceOracle
+from localsearch import linKernighanGenerator, orOptGenerator, twoOptNeighborGenerator
+from tour import ArrayTour
+
+# far more moves than any search needs on these instances
+MAX_MOVES = 10000
+
+
+def duplicateCities():
+    """20 points, each one three times"""
+    return np.tile(np.random.default_rng(1).random((20, 2)), (3, 1))
+
+
+def collinearCities():
+    x = np.random.default_rng(2).random(50)
+    return np.stack((x, 2 * x), axis=1)
+
+
+def tourLength(cities, order):
+    return np.hypot(*(cities[order] - cities[np.roll(order, -1)]).T).sum()
+
+
+def runSearch(generator, cities, **kwargs):
+    """Runs the search from a random tour, returns the number of moves and the lengths before and after"""
+    d = distanceOracle(cities)
+    order = np.random.default_rng(3).permutation(len(cities))
+    tour = ArrayTour(order)
+    moves = 0
+    for _ in generator(tour, d, d.neighborLists(8), **kwargs):
+        moves += 1
+        assert moves < MAX_MOVES, "the search does not terminate"
+    return moves, tourLength(cities, order), tourLength(cities, tour.order)
+
+
+@pytest.mark.parametrize("cities", [duplicateCities(), collinearCities()])
+def testTwoOptTerminates(cities):
+    moves, before, after = runSearch(twoOptNeighborGenerator, cities)
+    assert after < before
+
+
+@pytest.mark.parametrize("cities", [duplicateCities(), collinearCities()])
+def testOrOptTerminates(cities):
+    moves, before, after = runSearch(orOptGenerator, cities)
+    assert after < before
+
+
+@pytest.mark.parametrize("cities", [duplicateCities(), collinearCities()])
+def testLinKernighanTerminates(cities):
+    # without a time limit, which would end a cycling search as well
+    moves, before, after = runSearch(linKernighanGenerator, cities)
+    assert after < before
@@ -0,0 +1,127 @@
+import numpy as np
+
+
+class ArrayTour:
+    """Closed tour stored as the order of the cities and their positions in it
+
+    Used by the local search methods: neighbors are found in O(1) and a
+    segment is reversed in time proportional to the shorter side of the tour.
+    """
+    def __init__(self, order):
+        self.order = np.array(order, dtype=np.intp)
+        self.N = len(self.order)
+        self.pos = np.empty(self.N, dtype=np.intp)
+        self.pos[self.order] = np.arange(self.N)
+
+    def __len__(self):
+        return self.N
+
+    def next(self, c):
+        p = self.pos[c] + 1
+        return int(self.order[p if p < self.N else 0])
+
+    def prev(self, c):
+        return int(self.order[self.pos[c] - 1])
+
+    def between(self, a, b, c):
+        """Whether b is visited when going forward from a to c"""
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def reverse(self, a, b):
+        """Reverse the path going forward from city a to city b
+
+        If the path is longer than half of the tour, the rest of the tour is
+        reversed instead, which results in the same cyclic tour.
+        """
+        i, j = int(self.pos[a]), int(self.pos[b])
+        length = (j - i) % self.N + 1
+        if 2 * length > self.N:
+            i, j = (j + 1) % self.N, (i - 1) % self.N
+            length = self.N - length
+        if length < 2:
+            return
+
+        if i <= j:
+            seg = self.order[i:j + 1][::-1].copy()
+            self.order[i:j + 1] = seg
+            self.pos[seg] = np.arange(i, j + 1)
+        else:
+            idx = np.arange(i, i + length) % self.N
+            seg = self.order[idx][::-1]
+            self.order[idx] = seg
+            self.pos[seg] = idx
+
+
+class TourEdges:
+    """Edges of a (partial) tour as two neighbor slots per city
+
+    Adding and removing an edge is O(1). An edge may be present twice, which
+    is how a tour of two cities looks.
+    """
+    def __init__(self, N):
+        self.adj = np.full((N, 2), -1, dtype=np.intp)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, i, j):
+        si = 0 if self.adj[i, 0] < 0 else 1
+        sj = 0 if self.adj[j, 0] < 0 else 1
+        if self.adj[i, si] >= 0 or self.adj[j, sj] >= 0:
+            raise ValueError("city already has two edges")
+        self.adj[i, si] = j
+        self.adj[j, sj] = i
+        self.count += 1
+
+    def remove(self, i, j):
+        si = 0 if self.adj[i, 0] == j else 1
+        sj = 0 if self.adj[j, 0] == i else 1
+        if self.adj[i, si] != j or self.adj[j, sj] != i:
+            raise ValueError("no edge ({}, {})".format(i, j))
+        self.adj[i, si] = -1
+        self.adj[j, sj] = -1
+        self.count -= 1
+
+    def clear(self):
+        self.adj.fill(-1)
+        self.count = 0
+
+    def setOrder(self, order):
+        """Replace all edges by the closed tour visiting the cities in this order"""
+        order = np.asarray(order, dtype=np.intp)
+        self.clear()
+        self.adj[order, 0] = np.roll(order, 1)
+        self.adj[order, 1] = np.roll(order, -1)
+        self.count = len(order)
+
+    def ways(self):
+        """(E, 2) array of all edges (i, j) with i < j"""
+        i = np.arange(len(self.adj))
+        parts = []
+        for s in (0, 1):
+            mask = self.adj[:, s] > i
+            parts.append(np.column_stack((i[mask], self.adj[mask, s])))
+        return np.concatenate(parts)
+
+    def successors(self):
+        """Successor of every city along a closed tour, which is walked once"""
+        adj = self.adj.tolist()
+        succ = [-1] * len(adj)
+        prev, cur = adj[0][0], 0
+        for _ in range(len(adj)):
+            nxt = adj[cur][1] if adj[cur][0] == prev else adj[cur][0]
+            succ[cur] = nxt
+            prev, cur = cur, nxt
+        return np.array(succ, dtype=np.intp)
+
+    def order(self):
+        """Cities in the order of the closed tour, starting at 0"""
+        succ = self.successors().tolist()
+        order = [0]
+        for _ in range(len(succ) - 1):
+            order.append(succ[order[-1]])
+        return order
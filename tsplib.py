@@ -0,0 +1,389 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from distanceoracle import TRIANGLE_THRESHOLD, distanceOracle
+from metrics import METRICS
+
+# name of the index of the instance headers inside the TSPLIB folder
+INDEX_FILE = ".index.json"
+# folder next to the instances for their coordinates in binary form
+CACHE_DIR = ".cache"
+# folder of the binary forms of instances outside of a TSPLIB folder
+USER_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tspview", "instances")
+# formats of the matrix of EXPLICIT instances
+EXPLICIT_FORMATS = (
+    "FULL_MATRIX",
+    "UPPER_ROW", "LOWER_ROW", "UPPER_DIAG_ROW", "LOWER_DIAG_ROW",
+    "UPPER_COL", "LOWER_COL", "UPPER_DIAG_COL", "LOWER_DIAG_COL",
+)
+# version of the entries of the index, older indices are rebuilt
+INDEX_VERSION = 2
+# number of lines formatted at once by the writers
+CHUNK = 10000
+
+
+def openTSPLIB(file):
+    """Open a, possibly gzipped, TSPLIB file for reading text"""
+    if file.endswith(".gz"):
+        return gzip.open(file, "rt")
+    return open(file)
+
+
+def scanHeader(file):
+    """Read the specification part of a TSPLIB file, i.e., everything before the first data section
+
+    Returns the keywords as a dict, the name of the first data section is
+    stored as "SECTION".
+    """
+    header = {}
+    with openTSPLIB(file) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("EOF"):
+                break
+            if ":" not in line:
+                # a data section starts
+                header["SECTION"] = line.split()[0]
+                break
+            key, value = line.split(":", 1)
+            header[key.strip().upper()] = value.strip()
+    return header
+
+
+def readSections(file):
+    """Numbers of all data sections of a TSPLIB file, by the name of the section"""
+    lines = {}
+    current = None
+    with openTSPLIB(file) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line[0].isalpha():
+                word = line.split()[0].rstrip(":")
+                if word == "EOF":
+                    break
+                current = lines.setdefault(word, []) if word.endswith("_SECTION") else None
+                if current is not None:
+                    current.append(line[len(word):])
+            elif current is not None:
+                current.append(line)
+    return {k: np.array(" ".join(v).split(), dtype=np.float64) for k, v in lines.items()}
+
+
+def nodeCoordinates(values):
+    """(N, 2) array from the numbers of a NODE_COORD_SECTION or DISPLAY_DATA_SECTION"""
+    return values.reshape(-1, 3)[:, 1:]
+
+
+def explicitTriangle(values, N, edgeWeightFormat):
+    """Strict upper triangle, row by row, of the matrix given in any of the EXPLICIT formats
+
+    Integral weights are stored in the smallest integer type holding them.
+    """
+    if edgeWeightFormat == "FULL_MATRIX":
+        if len(values) < N * N:
+            raise ValueError("too few edge weights")
+        M = values[:N * N].reshape(N, N)
+    elif edgeWeightFormat in EXPLICIT_FORMATS:
+        upper = edgeWeightFormat.startswith("UPPER")
+        columns = edgeWeightFormat.endswith("COL")
+        diag = "DIAG" in edgeWeightFormat
+        # a column-wise lower triangle is the row-wise upper one, and vice versa
+        if upper != columns:
+            i, j = np.triu_indices(N, 0 if diag else 1)
+        else:
+            i, j = np.tril_indices(N, 0 if diag else -1)
+        if len(values) < len(i):
+            raise ValueError("too few edge weights")
+        M = np.zeros((N, N))
+        M[i, j] = values[:len(i)]
+        M[j, i] = values[:len(i)]
+    else:
+        raise ValueError("EDGE_WEIGHT_FORMAT {} is not supported".format(edgeWeightFormat))
+
+    tri = M[np.triu_indices(N, 1)]
+    if tri.size and np.all(tri == np.round(tri)):
+        dtype = np.result_type(np.min_scalar_type(int(tri.min())), np.min_scalar_type(int(tri.max())))
+        return tri.astype(dtype)
+    return tri
+
+
+def embed(tri, N):
+    """Positions in the plane approximating the distances (classical multidimensional scaling)
+
+    Used to draw EXPLICIT instances without display data.
+    """
+    D = np.zeros((N, N))
+    D[np.triu_indices(N, 1)] = tri
+    D2 = (D + D.T) ** 2
+    B = -0.5 * (D2 - D2.mean(axis=0) - D2.mean(axis=1)[:, None] + D2.mean())
+    w, v = np.linalg.eigh(B)
+    # the two largest eigenvalues come last
+    return v[:, -2:] * np.sqrt(np.maximum(w[-2:], 0.))
+
+
+def normalizeCoordinates(cities):
+    """Scale into the unit square, such that the longest side is 1"""
+    c = np.asarray(cities, dtype=np.float64).reshape(-1, 2)
+    minX, minY = c.min(axis=0)
+    maxX, maxY = c.max(axis=0)
+    length = max((maxX - minX), (maxY - minY))
+    # y-axis in Qt and TSPLIB are in different directions
+    return np.column_stack(((c[:, 0] - minX) / length, (maxY - c[:, 1]) / length))
+
+
+def cachePath(file, kind=""):
+    """Path of the binary form of an array of an instance
+
+    Instances of a TSPLIB folder are cached next to it by their file name,
+    all others in USER_CACHE_DIR by a hash of their absolute path.
+    """
+    folder, name = os.path.split(os.path.abspath(file))
+    if os.path.basename(folder) == "TSPLIB":
+        folder = os.path.join(folder, CACHE_DIR)
+    else:
+        name = hashlib.sha256(os.path.join(folder, name).encode()).hexdigest()[:16] + "-" + name
+        folder = USER_CACHE_DIR
+    return os.path.join(folder, name + ("." + kind if kind else "") + ".npy")
+
+
+class Instance:
+    """A TSPLIB instance: normalized cities for drawing and what is needed for its distances
+
+    Either the original coordinates for the metric of the edge weight type
+    or, for EXPLICIT instances, the upper triangle of the weights are set.
+    """
+    def __init__(self, name, edgeWeightType, cities, coords=None, weights=None):
+        self.name = name
+        self.edgeWeightType = edgeWeightType
+        self.cities = cities
+        self.coords = coords
+        self.weights = weights
+
+    def distances(self, threshold=TRIANGLE_THRESHOLD):
+        metric = METRICS[self.edgeWeightType] if self.coords is not None else None
+        return distanceOracle(self.cities, threshold, metric, self.coords, self.weights)
+
+
+def parseInstance(file, header):
+    sections = readSections(file)
+    edgeWeightType = header.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+    if edgeWeightType == "EXPLICIT":
+        N = int(header["DIMENSION"])
+        weights = explicitTriangle(sections["EDGE_WEIGHT_SECTION"], N, header.get("EDGE_WEIGHT_FORMAT", ""))
+        if "DISPLAY_DATA_SECTION" in sections:
+            display = nodeCoordinates(sections["DISPLAY_DATA_SECTION"])
+        else:
+            display = embed(weights, N)
+        return {"": normalizeCoordinates(display), "weights": weights}
+
+    coords = nodeCoordinates(sections["NODE_COORD_SECTION"])
+    return {"": normalizeCoordinates(coords), "coords": coords}
+
+
+def loadInstance(file):
+    """The instance of a TSPLIB file, memory-mapped from the binary cache
+
+    The cache is (re)built if it is older than the instance. If it can not be
+    written, the parsed arrays are used directly.
+    """
+    header = scanHeader(file)
+    name = header.get("NAME", os.path.basename(file).split(".")[0])
+    edgeWeightType = header.get("EDGE_WEIGHT_TYPE", "EUC_2D")
+    if edgeWeightType == "EXPLICIT":
+        kinds = ("", "weights")
+    elif edgeWeightType in METRICS:
+        kinds = ("", "coords")
+    else:
+        raise ValueError("EDGE_WEIGHT_TYPE {} is not supported".format(edgeWeightType))
+
+    paths = {kind: cachePath(file, kind) for kind in kinds}
+    try:
+        mtime = os.path.getmtime(file)
+        if all(os.path.getmtime(p) >= mtime for p in paths.values()):
+            arrays = {kind: np.load(p, mmap_mode="r") for kind, p in paths.items()}
+            return Instance(name, edgeWeightType, arrays[""], arrays.get("coords"), arrays.get("weights"))
+    except (OSError, ValueError):
+        pass
+
+    arrays = parseInstance(file, header)
+    try:
+        os.makedirs(os.path.dirname(paths[""]), exist_ok=True)
+        for kind, p in paths.items():
+            tmp = p + ".tmp.npy"
+            np.save(tmp, arrays[kind])
+            os.replace(tmp, p)
+        arrays = {kind: np.load(p, mmap_mode="r") for kind, p in paths.items()}
+    except OSError:
+        pass
+    return Instance(name, edgeWeightType, arrays[""], arrays.get("coords"), arrays.get("weights"))
+
+
+def loadCoordinates(file):
+    """Normalized coordinates of an instance"""
+    return loadInstance(file).cities
+
+
+def writeTSPLIB(file, cities, comment="Random Euclidian (Schawe)", scale=10 ** 5):
+    """Write the cities as EUC_2D instance, coordinates are multiplied by `scale`"""
+    cities = np.asarray(cities, dtype=np.float64).reshape(-1, 2) * scale
+    with open(file, "w") as f:
+        f.write("COMMENT : {}\n".format(comment))
+        f.write("TYPE : TSP\n")
+        f.write("DIMENSION : {}\n".format(len(cities)))
+        f.write("EDGE_WEIGHT_TYPE : EUC_2D\n")
+        f.write("NODE_COORD_SECTION\n")
+        for s in range(0, len(cities), CHUNK):
+            f.write("".join(
+                "{} {!r} {!r}\n".format(n, x, y)
+                for n, (x, y) in enumerate(cities[s:s + CHUNK].tolist(), start=s + 1)
+            ))
+
+
+def copyTSPLIB(source, file):
+    """Write an instance file decompressed to `file`"""
+    with openTSPLIB(source) as read:
+        with open(file, "w") as f:
+            shutil.copyfileobj(read, f)
+
+
+def writeTour(file, tour, name=""):
+    """Write the order of the cities (starting at 0) as TSPLIB .tour file"""
+    tour = np.asarray(tour, dtype=np.int64) + 1
+    with open(file, "w") as f:
+        f.write("NAME : {}\n".format(name or os.path.basename(file)))
+        f.write("TYPE : TOUR\n")
+        f.write("DIMENSION : {}\n".format(len(tour)))
+        f.write("TOUR_SECTION\n")
+        for s in range(0, len(tour), CHUNK):
+            f.write("\n".join(map(str, tour[s:s + CHUNK].tolist())))
+            f.write("\n")
+        f.write("-1\nEOF\n")
+
+
+def readTour(file):
+    """Order of the cities (starting at 0) of a TSPLIB .tour file"""
+    tour = []
+    started = False
+    with openTSPLIB(file) as f:
+        for line in f:
+            if not started:
+                started = "TOUR_SECTION" in line
+                continue
+            for i in line.split():
+                i = int(i)
+                if i == -1:
+                    return tour
+                tour.append(i - 1)
+    return tour
+
+
+def saveSolution(file, cities, tour):
+    """Store the (normalized) cities and a tour in one binary .npz file"""
+    with open(file, "wb") as f:
+        np.savez(f, cities=np.asarray(cities, dtype=np.float64),
+                 tour=np.asarray(tour, dtype=np.min_scalar_type(max(len(cities) - 1, 0))))
+
+
+def loadSolution(file):
+    """Cities and tour of a file written by saveSolution"""
+    with np.load(file) as data:
+        return data["cities"], data["tour"].astype(np.intp)
+
+
+def describe(file):
+    """Metadata of an instance as stored in the index"""
+    header = scanHeader(file)
+    try:
+        dimension = int(header.get("DIMENSION", 0))
+    except ValueError:
+        dimension = 0
+    section = header.get("SECTION", "")
+    return {
+        "name": header.get("NAME", os.path.basename(file).split(".")[0]),
+        "type": header.get("TYPE", ""),
+        "dimension": dimension,
+        "edgeWeightType": header.get("EDGE_WEIGHT_TYPE", ""),
+        "edgeWeightFormat": header.get("EDGE_WEIGHT_FORMAT", ""),
+        "coordinates": section == "NODE_COORD_SECTION",
+        # coordinates only for drawing, the solutions will deviate from the optimum
+        "displayable": header.get("DISPLAY_DATA_TYPE", "") == "TWOD_DISPLAY" or section == "DISPLAY_DATA_SECTION",
+    }
+
+
+class TSPLIBIndex:
+    """Metadata of all TSPLIB instances of a folder, kept in a file in that folder
+
+    An entry is only rebuilt if the modification time or the size of its
+    file changed.
+    """
+    def __init__(self, folder="TSPLIB"):
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_FILE)
+        self.entries = {}
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION:
+                self.entries = index["entries"]
+        except (OSError, ValueError, AttributeError, KeyError):
+            pass
+        self.update()
+
+    def update(self):
+        changed = False
+        present = set()
+        with os.scandir(self.folder) as it:
+            for e in it:
+                if not e.name.endswith(".tsp.gz") or not e.is_file():
+                    continue
+                present.add(e.name)
+                st = e.stat()
+                old = self.entries.get(e.name)
+                if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+                    continue
+                try:
+                    entry = describe(e.path)
+                except (OSError, EOFError, UnicodeDecodeError) as err:
+                    print("Error while reading {}: {}".format(e.path, err))
+                    continue
+                entry["mtime"] = st.st_mtime
+                entry["size"] = st.st_size
+                self.entries[e.name] = entry
+                changed = True
+
+        for name in set(self.entries) - present:
+            del self.entries[name]
+            changed = True
+
+        if changed:
+            self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"version": INDEX_VERSION, "entries": self.entries}, f, indent=0, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            # e.g., a read-only folder, the index is then rebuilt on the next start
+            print("Error while writing {}: {}".format(self.path, e))
+
+    def doable(self, maxDimension=None):
+        """Files of all symmetric instances with a supported edge weight type, smallest first"""
+        files = [
+            name for name, e in self.entries.items()
+            if e["type"] == "TSP"
+            and (e["coordinates"] and e["edgeWeightType"] in METRICS
+                 or e["edgeWeightType"] == "EXPLICIT" and e["edgeWeightFormat"] in EXPLICIT_FORMATS)
+            and (maxDimension is None or e["dimension"] < maxDimension)
+        ]
+        return sorted(files, key=lambda name: (self.entries[name]["dimension"], name))
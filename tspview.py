@@ -1,16 +1,30 @@
 from math import sqrt
+import sys
+import threading
+from time import perf_counter
 
+import numpy as np
 from PyQt5 import QtGui, QtCore, QtWidgets
 
 from configuration import Configuration
-from cityItem import CityItem
+from cityItem import CityItem, CityCloudItem
+from concorde import ConcordeRun
+from solverthread import LowerBoundThread, SolverThread
+from spatialindex import KDTree
+
+# from this many cities on, the cities and the tour are drawn as single items
+LARGE = 2000
 
 
 class tspView(QtWidgets.QGraphicsView, Configuration):
     lenChanged = QtCore.pyqtSignal(str)
     twoOptChanged = QtCore.pyqtSignal(str)
+    orOptChanged = QtCore.pyqtSignal(str)
+    linKernighanChanged = QtCore.pyqtSignal(str)
     gapChanged = QtCore.pyqtSignal(str)
     optimumChanged = QtCore.pyqtSignal(str)
+    lowerBoundChanged = QtCore.pyqtSignal(str)
+    boundGapChanged = QtCore.pyqtSignal(str)
     twoOptAvailable = QtCore.pyqtSignal(bool)
     TSPLIBChange = QtCore.pyqtSignal(str)
     zoomChange = QtCore.pyqtSignal(int)
@@ -26,18 +40,56 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         self.setResizeAnchor(self.AnchorUnderMouse)
         self.setTransformationAnchor(self.AnchorUnderMouse)
         self.cityItems = []
-        self.edgeItems = []
-        self.textItems = []
+        # items of the drawn edges (i, j), i < j, and of the values of LP edges
+        self.edgeItems = {}
+        self.textItems = {}
         self.edgeConcordeItems = []
+        # edges added (> 0) or removed (< 0) since they were last drawn
+        self.pendingWays = {}
+        self.redrawWays = False
+        self.lpWeights = {}
+        # large instances: one item for the tour and one for the cities, every
+        # way has a slot of two elements (moveTo, lineTo) in the path of the tour
+        self.large = False
+        self.tourItem = None
+        self.tourPath = None
+        self.pathSlots = {}
+        self.freeSlots = []
+        self.cloudItem = None
+        self.cityIndex = None
 
         self.timer = QtCore.QTimer()
         self.timestep = 500
-        self.timer.timeout.connect(self.step)
+        self.timer.timeout.connect(self.stepFrame)
+        # moves per tick of a run, 0 for as many as fit into frameBudget seconds
+        self.movesPerFrame = 1
+        self.frameBudget = 0.02
 
         self.restartTimer = QtCore.QTimer()
         self.restartTimer.timeout.connect(self.restart)
         self.restartTimer.setSingleShot(True)
 
+        # finish() runs in a background thread, its moves are drawn once per frame
+        self.solver = None
+        self.lock = threading.Lock()
+        self.stepMoves = []
+        self.drainTimer = QtCore.QTimer()
+        screen = QtGui.QGuiApplication.primaryScreen()
+        rate = screen.refreshRate() if screen is not None else 0
+        self.drainTimer.setInterval(int(1000 / (rate if rate > 0 else 60)))
+        self.drainTimer.timeout.connect(self.drainMoves)
+
+        # Concorde runs as a separate process, (QProcess, ConcordeRun) while it runs
+        self.concordeProcess = None
+        self.concordeTimer = QtCore.QTimer()
+        self.concordeTimer.setSingleShot(True)
+        self.concordeTimer.timeout.connect(self.concordeTimedOut)
+
+        # the Held-Karp bound of every instance is computed in the background,
+        # threads of previous instances are left to stop on their own
+        self.boundThread = None
+        self.oldBoundThreads = []
+
         self.citySelected = False
         self.manualTour = []
         self.currentLine = None
@@ -104,16 +156,30 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         color = self.getColorFromDialog(self.cityPen.color())
         self.cityPen.setColor(color)
         self.cityBrush.setColor(color)
+        for item in self.cityItems:
+            item.setPen(self.cityPen)
+            item.setBrush(self.cityBrush)
+        if self.cloudItem is not None:
+            self.cloudItem.setPen(self.cityPen)
         self.update()
 
     def changeColorTour(self):
         color = self.getColorFromDialog(self.tourPen.color())
         self.tourPen.setColor(color)
         self.tourPenIncomplete.setColor(color)
+        # the items keep copies of the pens
+        for items in self.edgeItems.values():
+            for item in items:
+                incomplete = item.pen().style() == QtCore.Qt.DotLine
+                item.setPen(self.tourPenIncomplete if incomplete else self.tourPen)
+        if self.tourItem is not None:
+            self.tourItem.setPen(self.tourPen)
         self.update()
 
     def changeColorConcorde(self):
         self.concordePen.setColor(self.getColorFromDialog(self.concordePen.color()))
+        for item in self.edgeConcordeItems:
+            item.setPen(self.concordePen)
         self.update()
 
     def changeMethod(self, method: str):
@@ -127,44 +193,187 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
     def rescale(self):
         self.updatePen()
 
+    def addWay(self, way):
+        super().addWay(way)
+        # moves of the solver thread reach the view through its queue
+        if self.solver is None:
+            self.markWay(way, 1)
+
+    def removeWay(self, way):
+        super().removeWay(way)
+        if self.solver is None:
+            self.markWay(way, -1)
+
+    def applyMove(self, toRemove, toAdd):
+        super().applyMove(toRemove, toAdd)
+        if self.solver is not None:
+            self.stepMoves.append((toRemove, toAdd))
+
+    def takeStepMoves(self):
+        moves = self.stepMoves
+        self.stepMoves = []
+        return moves
+
+    def markWay(self, way, n):
+        i, j = way
+        key = (i, j) if i < j else (j, i)
+        n += self.pendingWays.get(key, 0)
+        if n:
+            self.pendingWays[key] = n
+        else:
+            del self.pendingWays[key]
+
+    def setOrder(self, order):
+        super().setOrder(order)
+        if self.solver is not None:
+            self.stepMoves.append(None)
+        else:
+            self.redrawWays = True
+            self.pendingWays.clear()
+
+    def addEdgeItem(self, key, pen):
+        (x1, y1), (x2, y2) = self.getCities()[list(key)].tolist()
+        item = QtWidgets.QGraphicsLineItem(x1, y1, x2, y2)
+        item.setPen(pen)
+        self.edgeItems.setdefault(key, []).append(item)
+        self.scene.addItem(item)
+        return item
+
+    def removeEdgeItem(self, key):
+        items = self.edgeItems[key]
+        self.scene.removeItem(items.pop())
+        if not items:
+            del self.edgeItems[key]
+        text = self.textItems.pop(key, None)
+        if text is not None:
+            self.scene.removeItem(text)
+
+    def clearEdgeItems(self):
+        for items in self.edgeItems.values():
+            for item in items:
+                self.scene.removeItem(item)
+        self.edgeItems.clear()
+        for t in self.textItems.values():
+            self.scene.removeItem(t)
+        self.textItems.clear()
+        self.lpWeights = {}
+        if self.tourItem is not None:
+            self.tourItem.setPath(QtGui.QPainterPath())
+        self.tourPath = None
+        self.pathSlots = {}
+        self.freeSlots = []
+
+    def drawRelaxation(self):
+        """Update the drawn LP relaxation by the edges whose weight changed"""
+        weights = {}
+        if self.adjMatrix:
+            a = np.asarray(self.adjMatrix, dtype=np.float64).reshape(self.N, self.N)
+            i, j = np.nonzero(np.tril(a, -1) > 10e-5)
+            weights = dict(zip(zip(j.tolist(), i.tolist()), a[i, j].tolist()))
+
+        for key, w in self.lpWeights.items():
+            if weights.get(key) != w:
+                self.removeEdgeItem(key)
+
+        for key, w in weights.items():
+            if self.lpWeights.get(key) == w:
+                continue
+            item = self.addEdgeItem(key, self.tourPenIncomplete if w < 1 - 10e-5 else self.tourPen)
+            if w != 1:
+                line = item.line()
+                text = QtWidgets.QGraphicsTextItem("%.2f" % w)
+                text.setPos((line.x1() + line.x2()) / 2, (line.y1() + line.y2()) / 2)
+                text.setScale(2 / 1000)
+                text.setVisible(self.showValues)
+                self.textItems[key] = text
+                self.scene.addItem(text)
+        self.lpWeights = weights
+
+    def drawTourPath(self):
+        """Build the path of a large tour anew"""
+        self.tourPath = QtGui.QPainterPath()
+        self.pathSlots = {}
+        self.freeSlots = []
+        ways = self.getWays()
+        for n, ((i, j), (a, b)) in enumerate(zip(ways.tolist(), self.getCities()[ways].tolist())):
+            self.appendSegment(a, b)
+            self.pathSlots.setdefault((i, j) if i < j else (j, i), []).append(n)
+        if self.tourItem is None:
+            self.tourItem = QtWidgets.QGraphicsPathItem()
+            self.tourItem.setPen(self.tourPen)
+            self.scene.addItem(self.tourItem)
+        self.tourItem.setPath(self.tourPath)
+
+    def appendSegment(self, a, b):
+        (x1, y1), (x2, y2) = a, b
+        # the path drops lines of length zero, which would shift the slots
+        if x1 == x2 and y1 == y2:
+            x2 += 1e-9
+        self.tourPath.moveTo(x1, y1)
+        self.tourPath.lineTo(x2, y2)
+
+    def updateTourPath(self):
+        """Apply the pending ways to the path of a large tour in place"""
+        path = self.tourPath
+        c = self.getCities()
+        added = []
+        for key, n in self.pendingWays.items():
+            for _ in range(-n):
+                slots = self.pathSlots[key]
+                slot = slots.pop()
+                if not slots:
+                    del self.pathSlots[key]
+                self.freeSlots.append(slot)
+                # unused slots collapse onto a city, which is drawn there anyway
+                x, y = c[key[0]].tolist()
+                path.setElementPositionAt(2 * slot, x, y)
+                path.setElementPositionAt(2 * slot + 1, x, y)
+            added += [key] * n
+        self.pendingWays.clear()
+
+        for key in added:
+            a, b = c[list(key)].tolist()
+            if self.freeSlots:
+                slot = self.freeSlots.pop()
+                path.setElementPositionAt(2 * slot, *a)
+                path.setElementPositionAt(2 * slot + 1, *b)
+            else:
+                slot = path.elementCount() // 2
+                self.appendSegment(a, b)
+            self.pathSlots.setdefault(key, []).append(slot)
+        self.tourItem.setPath(path)
+
     def drawWays(self):
         # draw adjMatrix or ways?
         if self.lp:
-            c = self.getCities()
-            for i in range(self.N):
-                for j in range(i):
-                    w = self.adjMatrix[i * self.N + j]
-                    if w > 10e-5:
-                        x1, y1 = c[i]
-                        x2, y2 = c[j]
-                        item = QtWidgets.QGraphicsLineItem(x1, y1, x2, y2)
-                        if w < 1 - 10e-5:
-                            item.setPen(self.tourPenIncomplete)
-                        else:
-                            item.setPen(self.tourPen)
-                        self.edgeItems.append(item)
-                        self.scene.addItem(item)
-
-                        if w != 1:
-                            text = QtWidgets.QGraphicsTextItem("%.2f" % w)
-                            text.setPos((x1 + x2) / 2, (y1 + y2) / 2)
-                            text.setScale(2 / 1000)
-                            text.setVisible(self.showValues)
-                            self.textItems.append(text)
-                            self.scene.addItem(text)
-
+            self.drawRelaxation()
+        elif self.large:
+            # only the changed slots of the path are touched
+            if self.redrawWays or self.tourPath is None:
+                self.drawTourPath()
+                self.redrawWays = False
+            else:
+                self.updateTourPath()
+            self.pendingWays.clear()
         else:
-            # draw heuristic
-            for a, b in self.getWayCoordinates():
-                x1, y1 = a
-                x2, y2 = b
-                item = QtWidgets.QGraphicsLineItem(x1, y1, x2, y2)
-                item.setPen(self.tourPen)
-                self.edgeItems.append(item)
-                self.scene.addItem(item)
+            # only the edges changed since the last call are touched
+            if self.redrawWays:
+                self.clearEdgeItems()
+                self.pendingWays.clear()
+                for key in map(tuple, self.getWays().tolist()):
+                    self.pendingWays[key] = self.pendingWays.get(key, 0) + 1
+                self.redrawWays = False
+            for key, n in self.pendingWays.items():
+                for _ in range(n):
+                    self.addEdgeItem(key, self.tourPen)
+                for _ in range(-n):
+                    self.removeEdgeItem(key)
+            self.pendingWays.clear()
 
     def step(self):
-        if self.finishedFirst and (not self.do2Opt or self.finished2Opt):
+        if self.solver is not None:
+            return False
+        if self.finished():
             if self.running:
                 self.run(False)
                 # self.restartTimer.start(self.timestep * 15)
@@ -177,24 +386,102 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
             self.updateWays()
             return False
 
+    def stepFrame(self):
+        """Apply the moves of one frame of a run and draw them at once"""
+        if self.solver is not None:
+            return False
+        if self.lp or self.finished():
+            return self.step()
+
+        start = perf_counter()
+        n = 0
+        while not self.finished():
+            # not the step of the view, which would draw every move
+            if Configuration.step(self):
+                break
+            n += 1
+            if self.movesPerFrame:
+                if n >= self.movesPerFrame:
+                    break
+            elif perf_counter() - start >= self.frameBudget:
+                break
+        self.updateWays()
+        return False
+
+    def setMovesPerFrame(self, n: int):
+        self.movesPerFrame = n
+
+    def setFrameBudget(self, s: float):
+        self.frameBudget = s
+
     def updateWays(self):
-        for e in self.edgeItems:
-            self.scene.removeItem(e)
-        self.edgeItems.clear()
-        for t in self.textItems:
-            self.scene.removeItem(t)
-        self.textItems.clear()
         self.drawWays()
 
         self.update()
         self.lenChanged.emit("%.4f" % self.length())
         self.twoOptChanged.emit("%d" % self.n2Opt())
+        self.orOptChanged.emit("%d" % self.nOrOpt())
+        self.linKernighanChanged.emit("%d" % self.nLinKernighan())
         self.updateOptimum()
 
     def finish(self):
-        while not self.step():
-            if self.currentMethod == "LP & Cutting Planes":
-                self.viewport().repaint()
+        """Run to completion in the background, see waitForSolver to block"""
+        if self.solver is not None or self.finished():
+            return
+        self.solver = SolverThread(self, self.lock, parent=self)
+        self.solver.start()
+        self.drainTimer.start()
+
+    def drainMoves(self):
+        """Draw the moves of the solver thread, coalesced since the last frame"""
+        solver = self.solver
+        if solver is None:
+            self.drainTimer.stop()
+            return
+        done = solver.isFinished()
+        # while the solver holds the lock only the queued moves can be drawn
+        locked = self.lock.acquire(blocking=done)
+        try:
+            for m in solver.takeMoves():
+                if m is None:
+                    self.redrawWays = True
+                    self.pendingWays.clear()
+                else:
+                    toRemove, toAdd = m
+                    for w in toRemove:
+                        self.markWay(w, -1)
+                    for w in toAdd:
+                        self.markWay(w, 1)
+            if locked or not (self.lp or self.redrawWays):
+                self.updateWays()
+            if not locked and solver.progress is not None:
+                # a running local search updates the ways only when it is done
+                self.lenChanged.emit("%.4f" % solver.progress[1])
+        finally:
+            if locked:
+                self.lock.release()
+
+        if done:
+            self.solver = None
+            self.drainTimer.stop()
+            # ends an automatic run
+            self.step()
+
+    def waitForSolver(self):
+        while self.solver is not None:
+            self.solver.wait(10)
+            self.drainMoves()
+
+    def stopSolver(self):
+        if self.solver is None:
+            return
+        self.solver.requestInterruption()
+        self.solver.wait()
+        self.solver.takeMoves()
+        self.solver = None
+        self.drainTimer.stop()
+        self.redrawWays = True
+        self.pendingWays.clear()
 
     def run(self, b=True):
         self.running = b
@@ -209,25 +496,28 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         self.run(True)
 
     def setTimestep(self, s: float):
-        self.timestep = 1000 * s
+        self.timestep = int(1000 * s)
         self.run(False)
         self.run(True)
 
     def clearSolution(self):
+        self.stopSolver()
         super().clearSolution()
 
-        for e in self.edgeItems:
-            self.scene.removeItem(e)
-        self.edgeItems.clear()
-        for t in self.textItems:
-            self.scene.removeItem(t)
-        self.textItems.clear()
+        self.clearEdgeItems()
+        self.pendingWays.clear()
+        self.redrawWays = False
         self.citySelected = None
-        self.scene.removeItem(self.currentLine)
+        if self.currentLine is not None:
+            self.scene.removeItem(self.currentLine)
+            self.currentLine = None
         self.tourChange.emit("")
         self.update()
 
     def init(self):
+        self.stopSolver()
+        self.stopConcorde()
+        self.stopLowerBound()
         for e in self.edgeConcordeItems:
             self.scene.removeItem(e)
         self.edgeConcordeItems.clear()
@@ -235,21 +525,31 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         self.cityItems.clear()
         self.clearSolution()
         self.scene.clear()
+        self.tourItem = None
+        self.cloudItem = None
+        self.cityIndex = None
+        self.large = len(self.getCities()) >= LARGE
 
         super().init()
         self.rescale()
 
-        for n, point in enumerate(self.getCities()):
-            x, y = point
-            item = CityItem(x, y, self.pointsize, n, self.cityClicked)
-            item.setPen(self.cityPen)
-            item.setBrush(self.cityBrush)
-            self.cityItems.append(item)
-            self.scene.addItem(item)
+        if self.large:
+            self.cloudItem = CityCloudItem(self.getCities(), self.pointsize)
+            self.cloudItem.setPen(self.cityPen)
+            self.scene.addItem(self.cloudItem)
+        else:
+            for n, point in enumerate(self.getCities().tolist()):
+                x, y = point
+                item = CityItem(x, y, self.pointsize, n, self.cityClicked)
+                item.setPen(self.cityPen)
+                item.setBrush(self.cityBrush)
+                self.cityItems.append(item)
+                self.scene.addItem(item)
 
         self.fit()
         self.initScale = self.transform()
 
+        self.startLowerBound()
         self.update()
 
     def updateCurrentLine(self):
@@ -265,8 +565,27 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         if e.button() == QtCore.Qt.RightButton:
             self.cityClicked(0, True)
             self.updateCurrentLine()
+        elif e.button() == QtCore.Qt.LeftButton and self.large and self.currentMethod == "Manual":
+            # there are no items per city, look the city up in a spatial index
+            idx = self.cityAt(self.mapToScene(e.pos()))
+            if idx is not None:
+                self.cityClicked(idx)
         super().mousePressEvent(e)
 
+    def cityAt(self, pos, radius=5):
+        """City within `radius` pixels of the scene position `pos`"""
+        if self.cityIndex is None:
+            self.cityIndex = KDTree(self.getCities())
+        idx = self.cityIndex.nearest(pos.x(), pos.y())
+        if idx is None:
+            return None
+        x, y = self.getCities()[idx]
+        # scene units per pixel
+        r = radius / self.transform().m11() + self.pointsize / 2
+        if (x - pos.x()) ** 2 + (y - pos.y()) ** 2 > r * r:
+            return None
+        return idx
+
     def cityClicked(self, idx, undo=False):
         if self.currentMethod != "Manual" or self.finishedFirst:
             return
@@ -274,10 +593,10 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         if undo:
             if len(self.manualTour) < 2:
                 return
-            self.scene.removeItem(self.edgeItems.pop())
             self.removeWay((self.manualTour[-2], self.manualTour[-1]))
             self.manualTour.pop()
             self.citySelected = self.manualTour[-1]
+            self.updateWays()
 
         elif self.citySelected is None:
             c = self.getCities()
@@ -296,6 +615,7 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
                     self.addWay((self.manualTour[-1], self.manualTour[0]))
                     self.finishedFirst = True
                     self.scene.removeItem(self.currentLine)
+                    self.currentLine = None
                 self.updateWays()
 
                 self.citySelected = idx
@@ -320,43 +640,174 @@ class tspView(QtWidgets.QGraphicsView, Configuration):
         self.updateOptimum()
         self.update()
 
+    def loadTour(self, name):
+        super().loadTour(name)
+        self.updateWays()
+
+    def loadSolution(self, name):
+        super().loadSolution(name)
+        self.updateWays()
+
     def setDoConcorde(self, b):
         super().setDoConcorde(b)
-        self.updateOptimum()
-        if b:
-            self.concorde()
-        else:
+        if not b:
+            self.stopConcorde()
             for e in self.edgeConcordeItems:
                 self.scene.removeItem(e)
             self.edgeConcordeItems.clear()
+        self.updateOptimum()
 
     def concorde(self):
-        super().concorde()
+        """Show the optimum from the cache or start Concorde in the background"""
+        if self.currentEnsemble == "custom" or self.concordeProcess is not None:
+            return
+        if not self.hasOptimum():
+            run = ConcordeRun()
+            self.saveTSPLIB(run.instance)
+            tour = run.cached()
+            if tour is None:
+                self.startConcorde(run)
+                return
+            run.close()
+            self.setOptimalTour(tour)
+        self.drawConcorde()
+
+    def startConcorde(self, run):
+        process = QtCore.QProcess(self)
+        process.setWorkingDirectory(run.dir)
+        process.finished.connect(lambda *args: self.concordeFinished(process, run))
+        process.errorOccurred.connect(
+            lambda e: e == QtCore.QProcess.FailedToStart and self.concordeFinished(process, run))
+        self.concordeProcess = process, run
+        self.concordeTimer.start(int(1000 * self.concordeTimeout))
+        process.start(run.args[0], run.args[1:])
+
+    def concordeFinished(self, process, run):
+        # a run of a previous instance
+        if self.concordeProcess is None or self.concordeProcess[0] is not process:
+            run.close()
+            return
+        self.concordeProcess = None
+        self.concordeTimer.stop()
+        try:
+            self.setOptimalTour(run.tour())
+            self.drawConcorde()
+        except ValueError as e:
+            print(e, file=sys.stderr)
+        finally:
+            run.close()
+        self.updateOptimum()
+
+    def concordeTimedOut(self):
+        print("Concorde did not finish within {} s".format(self.concordeTimeout), file=sys.stderr)
+        self.stopConcorde()
+        self.updateOptimum()
+
+    def stopConcorde(self):
+        if self.concordeProcess is None:
+            return
+        process, run = self.concordeProcess
+        self.concordeProcess = None
+        self.concordeTimer.stop()
+        process.kill()
+        process.waitForFinished()
+        run.close()
+
+    def drawConcorde(self):
+        if self.edgeConcordeItems:
+            return
         # draw optimal
-        for a, b in self.concordeCoordinates():
-            x1, y1 = a
-            x2, y2 = b
-            item = QtWidgets.QGraphicsLineItem(x1, y1, x2, y2)
+        if self.large:
+            path = QtGui.QPainterPath()
+            for (x1, y1), (x2, y2) in self.concordeCoordinates().tolist():
+                path.moveTo(x1, y1)
+                path.lineTo(x2, y2)
+            item = QtWidgets.QGraphicsPathItem(path)
             item.setPen(self.concordePen)
             self.edgeConcordeItems.append(item)
             self.scene.addItem(item)
+        else:
+            for a, b in self.concordeCoordinates():
+                x1, y1 = a
+                x2, y2 = b
+                item = QtWidgets.QGraphicsLineItem(x1, y1, x2, y2)
+                item.setPen(self.concordePen)
+                self.edgeConcordeItems.append(item)
+                self.scene.addItem(item)
 
         self.update()
 
     def setShowValues(self, b):
         self.showValues = b
-        for i in self.textItems:
+        for i in self.textItems.values():
             i.setVisible(b)
         self.update()
 
     def updateOptimum(self):
-        if self.doConcorde:
+        if self.doConcorde and self.hasOptimum():
             self.optimumChanged.emit("%.4f" % self.optimalLength())
             gap = "%.2f%%" % ((self.length() / (self.optimalLength() + 1e-10) - 1) * 100)
+        elif self.doConcorde and self.concordeProcess is not None:
+            self.optimumChanged.emit("running")
+            gap = "n/a"
         else:
             self.optimumChanged.emit("n/a")
             gap = "n/a"
         self.gapChanged.emit(gap)
+        self.updateLowerBound()
+
+    def startLowerBound(self):
+        # do not estimate the optimum for competition
+        if self.currentEnsemble == "custom" or len(self.getCities()) < 3:
+            return
+        self.boundThread = LowerBoundThread(self.heldKarpFactory(), parent=self)
+        self.boundThread.improved.connect(self.lowerBoundImproved)
+        self.boundThread.start(QtCore.QThread.LowPriority)
+
+    def lowerBoundImproved(self, bound):
+        # a bound of a previous instance
+        if self.boundThread is None or self.sender() is not self.boundThread:
+            return
+        self.setLowerBound(bound)
+        self.updateLowerBound()
+
+    def stopLowerBound(self, wait=False):
+        """Interrupt the bound thread, which may still be building its engine, `wait` for all of them"""
+        if self.boundThread is not None:
+            thread = self.boundThread
+            self.boundThread = None
+            thread.requestInterruption()
+            thread.improved.disconnect()
+            self.oldBoundThreads.append(thread)
+            thread.finished.connect(lambda: self.boundThreadFinished(thread))
+            if thread.isFinished():
+                self.boundThreadFinished(thread)
+        if wait:
+            for thread in list(self.oldBoundThreads):
+                thread.wait()
+                self.boundThreadFinished(thread)
+
+    def boundThreadFinished(self, thread):
+        if thread in self.oldBoundThreads:
+            self.oldBoundThreads.remove(thread)
+            thread.deleteLater()
+
+    def updateLowerBound(self):
+        bound = self.lowerBound()
+        # the gap of an incomplete tour means nothing
+        complete = self.finishedFirst and not self.lp and self.length()
+        if bound:
+            # the bounds of large instances are estimates, which may exceed the optimum
+            approx = "" if self.lowerBoundIsExact() else "~"
+            self.lowerBoundChanged.emit(approx + "%.4f" % bound)
+            gap = approx + "%.2f%%" % ((self.length() / bound - 1) * 100) if complete else "n/a"
+            self.boundGapChanged.emit(gap)
+        else:
+            self.lowerBoundChanged.emit("n/a")
+            self.boundGapChanged.emit("n/a")
+        # better tours give better step sizes
+        if self.boundThread is not None and complete:
+            self.boundThread.upper = self.length()
 
     def saveSVG(self, name):
         pass
@@ -60,3 +60,54 @@ class UnionFindWrapper():
 
     def size(self, x):
         return self.S[x].find().size
+
+
+class ArrayUnionFind:
+    """Union-find on flat lists with union by rank and iterative path halving
+
+    Drop-in for UnionFindWrapper. Vertices other than 0, ..., N-1 are mapped
+    to indices.
+    """
+    def __init__(self, vertices):
+        vertices = list(vertices)
+        N = len(vertices)
+        if vertices == list(range(N)):
+            self.labels = None
+            self.index = None
+        else:
+            self.labels = vertices
+            self.index = {v: i for i, v in enumerate(vertices)}
+        self.parent = list(range(N))
+        self.rank = [0] * N
+        self.sizes = [1] * N
+
+    def root(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            # path halving: every node on the way points to its grandparent
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, r, s):
+        if self.index is not None:
+            r = self.index[r]
+            s = self.index[s]
+        r = self.root(r)
+        s = self.root(s)
+        if r == s:
+            return
+        if self.rank[r] < self.rank[s]:
+            r, s = s, r
+        elif self.rank[r] == self.rank[s]:
+            self.rank[r] += 1
+        self.parent[s] = r
+        self.sizes[r] += self.sizes[s]
+
+    def find(self, x):
+        i = self.root(x if self.index is None else self.index[x])
+        return i if self.labels is None else self.labels[i]
+
+    def size(self, x):
+        return self.sizes[self.root(x if self.index is None else self.index[x])]
+